@@ -0,0 +1,65 @@
+# Benchmark: plotly's to_json (what Dash uses by default) vs the opt-in
+# orjson serializer in cornell3 (FAST_JSON=1) on real dashboard payloads.
+#
+#   python bench_serialization.py [--number 50] [--repeat 5]
+import argparse
+import json
+import os
+import timeit
+
+os.environ.setdefault("WARMUP_ON_BOOT", "0")
+
+from plotly.io.json import to_json_plotly
+
+import cornell3
+
+
+def dash_response(outputs):
+    # Shape of a multi-output /_dash-update-component response body
+    return {'multi': True, 'response': {
+        component: {prop: value} for (component, prop), value in outputs.items()
+    }}
+
+
+def payloads():
+    snap = cornell3.current_snapshot()
+    year = snap.years[len(snap.years) // 2]
+    text, metrics, countries, fdi = cornell3.update_overview(year)
+    return {
+        'initial layout': cornell3.app.layout,
+        'Trends page': dash_response({('page-trends', 'children'): cornell3.build_tab_content(snap, 'trends')}),
+        'Overview page': dash_response({('page-overview', 'children'): cornell3.build_tab_content(snap, 'overview')}),
+        'Overview year change': dash_response({
+            ('overview_text', 'children'): text,
+            ('overview_metrics', 'children'): metrics,
+            ('overview_countries', 'figure'): countries,
+            ('overview_fdi', 'figure'): fdi
+        }),
+        'correlation heatmap': dash_response({('correlation_heatmap', 'figure'): cornell3.get_figure(snap, 'correlation_heatmap')})
+    }
+
+
+def best_ms(func, value, number, repeat):
+    return min(timeit.repeat(lambda: func(value), number=number, repeat=repeat)) / number * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare plotly and orjson serialization of dashboard payloads")
+    parser.add_argument('--number', type=int, default=50, help="calls per timing run")
+    parser.add_argument('--repeat', type=int, default=5, help="timing runs; the best is reported")
+    args = parser.parse_args()
+
+    if cornell3.orjson is None:
+        raise SystemExit("orjson is not installed; the fast serializer is unavailable")
+
+    print(f"{'payload':<24}{'bytes':>10}{'plotly ms':>12}{'orjson ms':>12}{'speedup':>10}")
+    for name, value in payloads().items():
+        default, fast = to_json_plotly(value), cornell3.fast_to_json(value)
+        assert json.loads(default) == json.loads(fast), f"{name}: serializers disagree"
+        default_ms = best_ms(to_json_plotly, value, args.number, args.repeat)
+        fast_ms = best_ms(cornell3.fast_to_json, value, args.number, args.repeat)
+        print(f"{name:<24}{len(default):>10,}{default_ms:>12.3f}{fast_ms:>12.3f}{default_ms / fast_ms:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
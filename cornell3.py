@@ -1,10 +1,55 @@
 import dash
 import dash_bootstrap_components as dbc
-from dash import dcc, html
+from dash import Patch, dcc, html
 import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
 import pandas as pd
-from dash.dependencies import Input, Output
+import numpy as np
+from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
+from flask import Response, abort, jsonify, redirect, request, send_file
+from plotly.offline import get_plotlyjs, get_plotlyjs_version
+from plotly.utils import PlotlyJSONEncoder
+from werkzeug.middleware.proxy_fix import ProxyFix
+from markupsafe import escape
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache, partial
+import gzip
+import hashlib
+import importlib.util
+import json
+import math
+import multiprocessing
 import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.parse
+import warnings
+
+# Optional: Parquet and Excel data downloads
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+# Optional (not in requirements.txt): faster JSON encoding for the metrics API,
+# and for Dash responses with FAST_JSON=1
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # --- Styling Constants for Cornell MBA Theme ---
 FONT_FAMILY = 'Montserrat, sans-serif'
@@ -24,48 +69,554 @@ external_stylesheets = [
 
 # Static data for 2016–2024 pulled from each EMR
 data = [
-    {'year': 2016, 'USA': 126, 'China': 98,  'India': 8,  'EMNC_total': 60,
+    {'year': 2016, 'EMNC_total': 60,
      'OFDI': 300, 'IFDI': 400, 'Greenfield': 150, 'M_and_A': 200,
      'GDP_share': 45.0, 'GDP_growth': 4.8, 'D_ESG': 50, 'Billionaire_count': 3500},
-    {'year': 2017, 'USA': 129, 'China': 108, 'India': 9,  'EMNC_total': 65,
+    {'year': 2017, 'EMNC_total': 65,
      'OFDI': 320, 'IFDI': 420, 'Greenfield': 160, 'M_and_A': 210,
      'GDP_share': 46.0, 'GDP_growth': 4.5, 'D_ESG': 52, 'Billionaire_count': 3750},
-    {'year': 2018, 'USA': 135, 'China': 129, 'India': 10, 'EMNC_total': 72,
+    {'year': 2018, 'EMNC_total': 72,
      'OFDI': 350, 'IFDI': 450, 'Greenfield': 170, 'M_and_A': 230,
      'GDP_share': 47.0, 'GDP_growth': 4.2, 'D_ESG': 54, 'Billionaire_count': 4000},
-    {'year': 2019, 'USA': 137, 'China': 134, 'India': 11, 'EMNC_total': 75,
+    {'year': 2019, 'EMNC_total': 75,
      'OFDI': 380, 'IFDI': 470, 'Greenfield': 180, 'M_and_A': 240,
      'GDP_share': 48.0, 'GDP_growth': 4.0, 'D_ESG': 56, 'Billionaire_count': 4200},
-    {'year': 2020, 'USA': 121, 'China': 124, 'India': 13, 'EMNC_total': 68,
+    {'year': 2020, 'EMNC_total': 68,
      'OFDI': 400, 'IFDI': 500, 'Greenfield': 160, 'M_and_A': 220,
      'GDP_share': 49.0, 'GDP_growth': 3.0, 'D_ESG': 58, 'Billionaire_count': 4400},
-    {'year': 2021, 'USA': 122, 'China': 133, 'India': 15, 'EMNC_total': 78,
+    {'year': 2021, 'EMNC_total': 78,
      'OFDI': 450, 'IFDI': 520, 'Greenfield': 190, 'M_and_A': 260,
      'GDP_share': 49.5, 'GDP_growth': 3.5, 'D_ESG': 60, 'Billionaire_count': 4600},
-    {'year': 2022, 'USA': 129, 'China': 145, 'India': 17, 'EMNC_total': 85,
+    {'year': 2022, 'EMNC_total': 85,
      'OFDI': 480, 'IFDI': 540, 'Greenfield': 200, 'M_and_A': 280,
      'GDP_share': 49.8, 'GDP_growth': 3.7, 'D_ESG': 61, 'Billionaire_count': 4800},
-    {'year': 2023, 'USA': 139, 'China': 144, 'India': 19, 'EMNC_total': 90,
+    {'year': 2023, 'EMNC_total': 90,
      'OFDI': 520, 'IFDI': 560, 'Greenfield': 210, 'M_and_A': 300,
      'GDP_share': 50.0, 'GDP_growth': 3.9, 'D_ESG': 62, 'Billionaire_count': 5000},
-    {'year': 2024, 'USA': 139, 'China': 145, 'India': 20, 'EMNC_total': 95,
+    {'year': 2024, 'EMNC_total': 95,
      'OFDI': 550, 'IFDI': 580, 'Greenfield': 220, 'M_and_A': 320,
      'GDP_share': 50.2, 'GDP_growth': 4.0, 'D_ESG': 63, 'Billionaire_count': 5200},
 ]
 
-# Create DataFrame and compute derived metrics
-df = pd.DataFrame(data)
-# Core ratios
-df['EMNC_share'] = df['EMNC_total'] / 500 * 100
-# FDI metrics
-df['FDI_net'] = df['IFDI'] - df['OFDI']
-df['FDI_ratio'] = df['IFDI'] / df['OFDI']
-# Greenfield vs M&A share
-df['Greenfield_share'] = df['Greenfield'] / (df['Greenfield'] + df['M_and_A']) * 100
-df['M_and_A_share'] = df['M_and_A'] / (df['Greenfield'] + df['M_and_A']) * 100
-# Intensity metrics
-df['D_ESG_per_100eMNC'] = df['D_ESG'] / df['EMNC_total'] * 100
-df['Billionaires_per_100eMNC'] = df['Billionaire_count'] / df['EMNC_total'] * 100
+# Fortune Global 500 companies by headquarters country, one count per year of
+# `data`. More countries can be listed here, or loaded in long format (year,
+# country, count) from the CSV named by COUNTRY_DATA_PATH.
+fortune500_by_country = {
+    'USA':   [126, 129, 135, 137, 121, 122, 129, 139, 139],
+    'China': [98, 108, 129, 134, 124, 133, 145, 144, 145],
+    'India': [8, 9, 10, 11, 13, 15, 17, 19, 20],
+}
+COUNTRY_DATA_PATH = os.environ.get("COUNTRY_DATA_PATH")
+# Optional CSV/JSON file with the same fields as `data`, replacing it
+DATA_PATH = os.environ.get("DATA_PATH")
+# Optional long-format CSV/Parquet file (date, series, value) of high-frequency
+# series, e.g. monthly or daily values per entity, for the Trends tab
+SERIES_PATH = os.environ.get("SERIES_PATH")
+# Optional directory of other report editions, one CSV/JSON file per edition
+# with the same fields as `data`; the file name (without extension) is the
+# edition's label. The data above is always the "Current" edition; a file
+# named like it is labelled "Current (file)" instead.
+EDITIONS_DIR = os.environ.get("EDITIONS_DIR")
+CURRENT_EDITION = "Current"
+
+# Derived metrics, computed from the base columns of a frame or a single row
+DERIVED_METRICS = {
+    # Core ratios
+    'EMNC_share': lambda d: d['EMNC_total'] / 500 * 100,
+    # FDI metrics
+    'FDI_net': lambda d: d['IFDI'] - d['OFDI'],
+    'FDI_ratio': lambda d: d['IFDI'] / d['OFDI'],
+    # Greenfield vs M&A share
+    'Greenfield_share': lambda d: d['Greenfield'] / (d['Greenfield'] + d['M_and_A']) * 100,
+    'M_and_A_share': lambda d: d['M_and_A'] / (d['Greenfield'] + d['M_and_A']) * 100,
+    # Intensity metrics
+    'D_ESG_per_100eMNC': lambda d: d['D_ESG'] / d['EMNC_total'] * 100,
+    'Billionaires_per_100eMNC': lambda d: d['Billionaire_count'] / d['EMNC_total'] * 100,
+}
+
+def add_derived_metrics(frame):
+    return frame.assign(**DERIVED_METRICS)
+
+# --- Compact storage (opt-in with COMPACT_STORAGE=1) ---
+# Base columns are downcast and written once per host to a directory of .npy
+# files that every worker memory-maps read-only, so the OS page cache holds a
+# single copy however many gunicorn workers are running. Key columns are
+# stored as categorical codes, and derived metrics are not materialized; they
+# are computed on demand by metrics_frame / year_row. Float columns are only
+# narrowed to float32 when no value changes (GDP_share's 50.2 would not).
+COMPACT_STORAGE = os.environ.get("COMPACT_STORAGE", "").lower() in ("1", "true", "yes")
+COMPACT_STORE_DIR = os.environ.get("COMPACT_STORE_DIR", os.path.join(tempfile.gettempdir(), "cornell_store"))
+CATEGORICAL_KEYS = ['year', 'country']
+COMPACT_STORE_FORMAT = 2  # bump when downcast_frame changes, so old stores are not reused
+
+def downcast_frame(frame):
+    columns = {}
+    for col in frame:
+        if pd.api.types.is_integer_dtype(frame[col]):
+            columns[col] = pd.to_numeric(frame[col], downcast='integer')
+        elif pd.api.types.is_float_dtype(frame[col]):
+            narrow = pd.to_numeric(frame[col], downcast='float')
+            lossless = narrow.astype('float64').equals(frame[col].astype('float64'))
+            columns[col] = narrow if lossless else frame[col]
+        else:
+            columns[col] = frame[col]
+    return pd.DataFrame(columns)
+
+def write_compact_store(frame, root):
+    # The directory name is a content hash, so a changed dataset gets a new
+    # store and concurrent workers writing the same one are harmless
+    digest = hashlib.sha256(f"{COMPACT_STORE_FORMAT}|{frame.to_csv(index=False)}".encode()).hexdigest()[:16]
+    path = os.path.join(root, digest)
+    if os.path.exists(path):
+        return path
+    os.makedirs(root, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(dir=root)
+    meta = {'columns': list(frame.columns), 'categories': {}}
+    compact = downcast_frame(frame)
+    for col in compact:
+        values = compact[col]
+        if col in CATEGORICAL_KEYS:
+            cat = pd.Categorical(values, ordered=True)
+            meta['categories'][col] = cat.categories.tolist()
+            values = pd.Series(cat.codes)
+        np.save(os.path.join(tmp_path, f"{col}.npy"), values.to_numpy())
+    with open(os.path.join(tmp_path, "meta.json"), 'w') as f:
+        json.dump(meta, f)
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # Another worker published the same store first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    return path
+
+def load_compact_store(path):
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    columns = {}
+    for col in meta['columns']:
+        values = np.load(os.path.join(path, f"{col}.npy"), mmap_mode='r')
+        if col in meta['categories']:
+            values = pd.Categorical.from_codes(values, categories=meta['categories'][col], ordered=True)
+        columns[col] = values
+    return pd.DataFrame(columns, copy=False)
+
+def read_metrics_file(path):
+    return pd.read_json(path) if path.endswith('.json') else pd.read_csv(path)
+
+def load_metrics_frame():
+    if DATA_PATH:
+        return read_metrics_file(DATA_PATH)
+    return pd.DataFrame(data)
+
+def edition_files():
+    if not EDITIONS_DIR:
+        return []
+    return sorted(os.path.join(EDITIONS_DIR, name) for name in os.listdir(EDITIONS_DIR) if name.endswith(('.csv', '.json')))
+
+# Long (edition, year, metric, value) table of every edition file, with the
+# derived metrics computed per edition
+def edition_label(path):
+    label = os.path.splitext(os.path.basename(path))[0]
+    return f"{label} (file)" if label == CURRENT_EDITION else label
+
+def load_editions_frame():
+    frames = [
+        add_derived_metrics(read_metrics_file(path))
+        .melt(id_vars='year', var_name='metric')
+        .assign(edition=edition_label(path))
+        for path in edition_files()
+    ]
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+def load_country_frame():
+    if COUNTRY_DATA_PATH:
+        frame = pd.read_csv(COUNTRY_DATA_PATH, usecols=['year', 'country', 'count'])
+    else:
+        years = [row['year'] for row in data]
+        frame = pd.DataFrame(
+            [(year, country, count)
+             for country, counts in fortune500_by_country.items()
+             for year, count in zip(years, counts)],
+            columns=['year', 'country', 'count']
+        )
+    frame['country'] = frame['country'].astype('category')
+    return frame
+
+def load_series_frame():
+    if not SERIES_PATH:
+        return None
+    columns = ['date', 'series', 'value']
+    if SERIES_PATH.endswith('.parquet'):
+        frame = pd.read_parquet(SERIES_PATH, columns=columns)
+    else:
+        frame = pd.read_csv(SERIES_PATH, usecols=columns)
+    return frame.assign(date=pd.to_datetime(frame['date']), series=frame['series'].astype(str)).dropna()
+
+# One (x, y) pair per series: int64 nanosecond timestamps in ascending order
+# and float64 values, ready for binary-search windowing and downsampling
+def index_series(frame):
+    if frame is None:
+        return {}
+    frame = frame.sort_values(['series', 'date'], kind='stable')
+    return {
+        name: (group['date'].to_numpy('datetime64[ns]').view('int64'), group['value'].to_numpy('float64'))
+        for name, group in frame.groupby('series', sort=True)
+    }
+
+# --- Country aggregation engine ---
+# Countries are ranked within each year once per snapshot (vectorized); top-N /
+# "Other" breakdowns are then slices of that ranking, cached per (year, N).
+# "Other" holds the countries outside the top N plus whatever part of the
+# year's eMNC total is not attributed to any listed country.
+TOP_N_COUNTRIES = 3
+COUNTRY_COLORS = {'USA': COLORS['primary'], 'China': COLORS['accent'], 'India': '#FFA500', 'Other': COLORS['secondary']}
+
+def rank_countries(frame):
+    ranked = frame.assign(year=frame['year'].astype('int64'), count=frame['count'].astype('int64'))
+    ranked = ranked.sort_values(['year', 'count', 'country'], ascending=[True, False, True], ignore_index=True)
+    ranked['rank'] = ranked.groupby('year').cumcount()
+    return ranked
+
+# Countries without a fixed colour get one picked by a stable hash of the name,
+# so every thread and process gives a country the same colour
+def country_color(country):
+    if country in COUNTRY_COLORS:
+        return COUNTRY_COLORS[country]
+    palette = px.colors.qualitative.Plotly
+    digest = hashlib.sha1(str(country).encode()).digest()
+    return palette[int.from_bytes(digest[:4], 'big') % len(palette)]
+
+# Metrics measured in percent; their changes are shown in points
+PERCENT_METRICS = {'GDP_share', 'GDP_growth', 'EMNC_share', 'Greenfield_share', 'M_and_A_share'}
+
+# Report projections on the Future tab:
+# (title, metric, headline, projected values by year, target year, value format)
+FUTURE_PROJECTIONS = [
+    ("eMNC Growth", 'EMNC_total', "Projected to reach 120 by 2026", {2025: 108, 2026: 120}, 2026, "{:.0f}"),
+    ("ESG Performance", 'D_ESG', "Target score of 75 by 2025", {2025: 75, 2026: 82}, 2025, "{:.0f}"),
+    ("Greenfield Investment", 'Greenfield_share', "Expected to reach 45% share", {2025: 43, 2026: 45}, 2026, "{:.0f}%"),
+]
+
+# --- Dataset snapshots ---
+# Everything derived from one load of the data hangs off an immutable
+# snapshot. A refresh builds a complete new snapshot and swaps it in, so a
+# callback that reads current_snapshot() once works on consistent data (and
+# caches) throughout, and never waits for a rebuild.
+class DatasetSnapshot:
+    def __init__(self, version, df, countries_df, series=None, editions_df=None, source_signature=None):
+        self.version = version
+        self.source_signature = source_signature  # _source_signature() taken before the files were read
+        self.loaded_at = pd.Timestamp.now(tz='UTC')
+        self.df = df
+        self.series = series or {}
+        self.editions_df = editions_df
+        self.countries_df = countries_df
+        self.years = [int(y) for y in df['year']]
+        self.latest_year = max(self.years)
+        self.metric_columns = [c for c in df.columns if c != 'year'] + [c for c in DERIVED_METRICS if c not in df]
+        self.country_ranks = rank_countries(countries_df)
+        self._rank_years = self.country_ranks['year'].to_numpy()
+        self._unattributed = (
+            pd.Series(df['EMNC_total'].to_numpy(), index=df['year'].astype('int64'))
+            - self.country_ranks.groupby('year')['count'].sum()
+        ).clip(lower=0).fillna(0)
+        self._cache = {}
+        self._bounded = {}  # kind -> OrderedDict of per-request results, see cached_bounded
+        self._inflight = {}  # key -> Future for computations still running
+        self._lock = threading.Lock()
+
+    # Memoize a computation for the lifetime of this snapshot. Concurrent
+    # callers asking for the same missing key wait for one computation instead
+    # of each running it (e.g. a burst of Correlations tab opens after a refresh)
+    def cached(self, key, compute):
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            value = self._cache.setdefault(key, compute())
+            future.set_result(value)
+            return value
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    # Memoize a per-request computation (slider values, API queries, zoom
+    # windows) for the lifetime of this snapshot, keeping the maxsize most
+    # recently used results of each kind
+    def cached_bounded(self, kind, key, compute, maxsize):
+        with self._lock:
+            entries = self._bounded.setdefault(kind, OrderedDict())
+            if key in entries:
+                entries.move_to_end(key)
+                return entries[key]
+        value = compute()
+        with self._lock:
+            entries[key] = value
+            entries.move_to_end(key)
+            while len(entries) > maxsize:
+                entries.popitem(last=False)
+        return value
+
+    def top_countries(self, year, n=TOP_N_COUNTRIES):
+        def compute():
+            start, end = np.searchsorted(self._rank_years, [year, year + 1])
+            ranked = self.country_ranks.iloc[start:end]
+            top = ranked.iloc[:n]
+            other = int(ranked['count'].iloc[n:].sum() + self._unattributed.get(year, 0))
+            return tuple(top['country'].astype(str)), tuple(top['count'].tolist()), other
+        return self.cached(('top_countries', year, n), compute)
+
+    # Countries with the most Fortune 500 companies over the whole period
+    def top_countries_overall(self, n=TOP_N_COUNTRIES):
+        def compute():
+            totals = self.country_ranks.groupby('country', observed=True)['count'].sum()
+            return tuple(totals.sort_values(ascending=False, kind='stable').index[:n].astype(str))
+        return self.cached(('top_countries_overall', n), compute)
+
+    # Accessors that work for both storage modes; country names can be
+    # requested as columns and are pivoted out of the long-format table
+    def metrics_frame(self, columns):
+        df = self.df
+        frame = df[['year'] + [c for c in columns if c in df]]
+        derived = [c for c in columns if c in DERIVED_METRICS and c not in df]
+        if derived:
+            # Compute in float64 so downcast integer columns cannot overflow
+            base = df.drop(columns=CATEGORICAL_KEYS, errors='ignore').astype('float64')
+            frame = frame.assign(**{c: DERIVED_METRICS[c](base) for c in derived})
+        countries = [c for c in columns if c not in df and c not in DERIVED_METRICS]
+        if countries:
+            wide = self.country_table()
+            years = frame['year'].astype('int64')
+            frame = frame.assign(**{c: wide[c].reindex(years).to_numpy() for c in countries})
+        return frame[['year'] + list(columns)]
+
+    # Year-indexed float tables of every metric and every country's count
+    def metrics_table(self):
+        def compute():
+            table = self.metrics_frame(self.metric_columns).astype({'year': 'int64'})
+            return table.set_index('year').sort_index().astype('float64')
+        return self.cached('metrics_table', compute)
+
+    def country_table(self):
+        def compute():
+            wide = self.country_ranks.pivot(index='year', columns='country', values='count')
+            wide.columns = wide.columns.astype(str)
+            return wide.astype('float64')
+        return self.cached('country_table', compute)
+
+    # --- Diff engine: computed once per snapshot, vectorized over all metrics ---
+    # Year-over-year change of every metric: absolute and in percent
+    def yoy_changes(self):
+        def compute():
+            table = self.metrics_table()
+            return table.diff(), table.pct_change(fill_method=None) * 100
+        return self.cached('yoy_changes', compute)
+
+    # Compound annual growth rate (%) of every metric over the whole period;
+    # NaN where the first or last value is not positive
+    def cagr(self):
+        def compute():
+            table = self.metrics_table()
+            first, last = table.iloc[0], table.iloc[-1]
+            span = table.index[-1] - table.index[0]
+            valid = (first > 0) & (last > 0) & (span > 0)
+            growth = (last.where(valid) / first.where(valid)) ** (1 / max(span, 1)) - 1
+            return growth * 100
+        return self.cached('cagr', compute)
+
+    # Pre-rendered "↑ 4.2% from 2019" labels for the metric cards, keyed by
+    # (year, metric); percentage metrics change in points rather than percent
+    def delta_labels(self):
+        def compute():
+            absolute, percent = self.yoy_changes()
+            labels = {}
+            years = list(absolute.index)
+            for prev_year, year in zip(years, years[1:]):
+                for metric in absolute.columns:
+                    change = absolute.at[year, metric] if metric in PERCENT_METRICS else percent.at[year, metric]
+                    if pd.isna(change) or np.isinf(change):
+                        continue
+                    unit = " pts" if metric in PERCENT_METRICS else "%"
+                    arrow, class_name = ("↑", "text-success") if change >= 0 else ("↓", "text-danger")
+                    labels[year, metric] = (f"{arrow} {abs(change):.1f}{unit} from {prev_year}", class_name)
+            return labels
+        return self.cached('delta_labels', compute)
+
+    # Future tab projections compared against the latest reported year
+    def projection_deltas(self):
+        def compute():
+            table = self.metrics_table()
+            deltas = {}
+            for title, metric, _, projected, target_year, _ in FUTURE_PROJECTIONS:
+                actual = table.at[self.latest_year, metric]
+                target = projected[target_year]
+                if metric in PERCENT_METRICS:
+                    change, unit = target - actual, " pts"
+                else:
+                    change, unit = (target - actual) / actual * 100, "%"
+                arrow = "↑" if change >= 0 else "↓"
+                deltas[title] = (actual, f"{arrow} {abs(change):.0f}{unit} from {self.latest_year}")
+            return deltas
+        return self.cached('projection_deltas', compute)
+
+    # Pairwise correlations behind the Correlations heatmap
+    def correlation_matrix(self):
+        def compute():
+            cols = correlation_columns(self)
+            return self.metrics_frame(cols)[cols].corr()
+        return self.cached('correlation_matrix', compute)
+
+    # --- Edition comparison ---
+    # Every edition (the current data first) as one dense float64 cube indexed
+    # [edition, year, metric], NaN where an edition lacks a value
+    def edition_cube(self):
+        def compute():
+            current = (self.metrics_table().rename_axis(columns='metric').stack().rename('value')
+                       .reset_index().assign(edition=CURRENT_EDITION))
+            long = pd.concat([current, self.editions_df], ignore_index=True)
+            editions = [CURRENT_EDITION] + sorted(set(long['edition']) - {CURRENT_EDITION})
+            years = sorted(int(y) for y in long['year'].unique())
+            metrics = list(dict.fromkeys(long['metric']))
+            cube = np.full((len(editions), len(years), len(metrics)), np.nan)
+            cube[
+                pd.Categorical(long['edition'], categories=editions).codes,
+                pd.Categorical(long['year'].astype('int64'), categories=years).codes,
+                pd.Categorical(long['metric'], categories=metrics).codes
+            ] = long['value'].to_numpy('float64')
+            return editions, years, metrics, cube
+        return self.cached('edition_cube', compute)
+
+    # Revisions of every edition against one base edition in one broadcast:
+    # revisions[edition, year, metric] = cube[edition] - cube[base]
+    def edition_revisions(self, base):
+        def compute():
+            names, _, _, cube = self.edition_cube()
+            return cube - cube[names.index(base)]
+        return self.cached(('edition_revisions', base), compute)
+
+    # r, two-sided p-value, bootstrap confidence interval and the range of
+    # rolling-window r for every pair of correlation_columns, as K x K arrays
+    def correlation_stats(self):
+        def compute():
+            cols = correlation_columns(self)
+            values = self.metrics_frame(cols)[cols].to_numpy('float64')
+            r = batched_corr(values)
+            valid = ~np.isnan(values)
+            pairs = valid.T.astype('int64') @ valid.astype('int64')
+            with np.errstate(divide='ignore', invalid='ignore'):
+                t = r * np.sqrt((pairs - 2) / (1 - r * r))
+            ci_low, ci_high = bootstrap_corr_ci(values, CORRELATION_BOOTSTRAP, CORRELATION_CI)
+            window = min(CORRELATION_WINDOW, len(values))
+            rolling = batched_corr(np.lib.stride_tricks.sliding_window_view(values, window, axis=0).swapaxes(-1, -2))
+            with warnings.catch_warnings():
+                # Pairs with no defined window r stay NaN
+                warnings.simplefilter('ignore', RuntimeWarning)
+                rolling_low, rolling_high = np.nanmin(rolling, axis=0), np.nanmax(rolling, axis=0)
+            return {
+                'columns': cols, 'r': r, 'p': t_two_sided_p(t, pairs - 2),
+                'ci_low': ci_low, 'ci_high': ci_high,
+                'window': window, 'rolling': rolling, 'rolling_low': rolling_low, 'rolling_high': rolling_high
+            }
+        return self.cached('correlation_stats', compute)
+
+    def year_row(self, year):
+        df = self.df
+        row = df[df['year'] == year].iloc[0]
+        missing = [name for name in DERIVED_METRICS if name not in row.index]
+        if not missing:
+            return row
+        # Compute in float64 so downcast integer columns cannot overflow
+        keys = row.index.intersection(CATEGORICAL_KEYS)
+        values = row.drop(keys).astype('float64')
+        derived = pd.Series({name: DERIVED_METRICS[name](values) for name in missing}, dtype='float64')
+        return pd.concat([row[keys], values, derived])
+
+# (mtime, size) of every source file; load_snapshot records it and the
+# refresh thread polls it
+def _source_signature():
+    signature = []
+    try:
+        editions = edition_files()
+    except OSError:
+        # EDITIONS_DIR is missing or unreadable; recorded like a missing file
+        editions = [EDITIONS_DIR]
+    for path in (DATA_PATH, COUNTRY_DATA_PATH, SERIES_PATH, *editions):
+        if path:
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append((path, None, None))
+    return tuple(signature)
+
+def load_snapshot():
+    # Taken first, so an edit made while the files are read still counts as a change
+    signature = _source_signature()
+    metrics, countries, series = load_metrics_frame(), load_country_frame(), load_series_frame()
+    editions = load_editions_frame()
+    digest = hashlib.sha256((metrics.to_csv(index=False) + countries.to_csv(index=False)).encode())
+    for extra in (series, editions):
+        if extra is not None:
+            digest.update(pd.util.hash_pandas_object(extra, index=False).to_numpy().tobytes())
+    version = digest.hexdigest()[:12]
+    if COMPACT_STORAGE:
+        df = load_compact_store(write_compact_store(metrics, COMPACT_STORE_DIR))
+        countries = load_compact_store(write_compact_store(countries, COMPACT_STORE_DIR))
+    else:
+        df = add_derived_metrics(metrics)
+    return DatasetSnapshot(version, df, countries, index_series(series), editions, signature)
+
+# Cell-level differences between two snapshots (metrics and country counts):
+# one row per (year, column) whose value changed, appeared or disappeared
+def diff_snapshots(old, new):
+    def compute():
+        before = pd.concat([old.metrics_table(), old.country_table()], axis=1)
+        after = pd.concat([new.metrics_table(), new.country_table()], axis=1)
+        before, after = before.align(after)
+        unchanged = np.isclose(before.to_numpy(), after.to_numpy(), equal_nan=True)
+        diff = pd.DataFrame({
+            'old': before.where(~unchanged).stack(),
+            'new': after.where(~unchanged).stack()
+        }).rename_axis(['year', 'column']).reset_index()
+        diff['change'] = diff['new'] - diff['old']
+        return diff
+    # Stored on the newer snapshot: old versions are immutable too
+    return new.cached(('diff', old.version), compute)
+
+# The current snapshot plus a few predecessors, kept for version diffs
+SNAPSHOT_HISTORY_SIZE = int(os.environ.get("SNAPSHOT_HISTORY_SIZE", 5))
+
+_snapshot = load_snapshot()
+_snapshot_history = deque([_snapshot], maxlen=SNAPSHOT_HISTORY_SIZE)
+
+def current_snapshot():
+    return _snapshot
+
+def snapshot_history():
+    return list(_snapshot_history)
+
+def find_snapshot(version):
+    return next((snap for snap in snapshot_history() if snap.version == version), None)
+
+# Rebinding a module global is atomic, so readers see either the old or the
+# new snapshot, never a mix
+def publish_snapshot(snap):
+    global _snapshot
+    _snapshot_history.append(snap)
+    _snapshot = snap
 
 # Detailed yearly summaries
 summaries = {
@@ -143,8 +694,389 @@ summaries = {
 """
 }
 
+# --- Figure definitions (shared by the tabs and the export endpoint) ---
+# Trends tab charts: (figure id, y column(s), title); FORTUNE500_SERIES plots
+# the top countries from the long-format country table instead of a column
+FORTUNE500_SERIES = 'fortune500'
+TRENDS_FIGURES = [
+    ('fortune500_counts', FORTUNE500_SERIES, "Fortune Global 500 Counts"),
+    ('emnc_total', 'EMNC_total', "Total Emerging Market MNCs"),
+    ('billionaire_count', 'Billionaire_count', "Global Billionaires"),
+    ('fdi_flows', ['OFDI', 'IFDI'], "FDI Flows (bn USD)"),
+    ('greenfield_vs_ma', ['Greenfield', 'M_and_A'], "Greenfield vs M&A (bn USD)"),
+    ('fdi_net', 'FDI_net', "FDI Net (bn USD)"),
+    ('fdi_ratio', 'FDI_ratio', "FDI Ratio (In/Out)"),
+    ('greenfield_vs_ma_share', ['Greenfield_share', 'M_and_A_share'], "Greenfield vs M&A Share (%)"),
+    ('d_esg_per_100emnc', 'D_ESG_per_100eMNC', "D-ESG per 100 eMNCs (%)"),
+    ('billionaires_per_100emnc', 'Billionaires_per_100eMNC', "Billionaires per 100 eMNCs (%)"),
+]
+
+# Metrics included in the correlation analysis, along with the Fortune 500
+# counts of the top countries (see correlation_columns)
+CORRELATION_COLUMNS = [
+    'EMNC_total',
+    'OFDI', 'IFDI', 'GDP_share', 'GDP_growth',
+    'D_ESG', 'Billionaire_count', 'EMNC_share',
+    'FDI_net', 'FDI_ratio', 'Greenfield_share',
+    'M_and_A_share', 'D_ESG_per_100eMNC',
+    'Billionaires_per_100eMNC'
+]
+
+def build_trends_figure(snap, y, title):
+    if y == FORTUNE500_SERIES:
+        countries = snap.top_countries_overall()
+        frame = snap.country_ranks[snap.country_ranks['country'].isin(countries)]
+        return px.line(
+            frame, x='year', y='count', color='country', title=title,
+            category_orders={'country': list(countries)},
+            color_discrete_map={c: country_color(c) for c in countries}
+        )
+    return px.line(snap.metrics_frame(y if isinstance(y, list) else [y]), x='year', y=y, title=title)
+
+def correlation_columns(snap):
+    return CORRELATION_COLUMNS[:1] + list(snap.top_countries_overall()) + CORRELATION_COLUMNS[1:]
+
+# --- Correlation statistics ---
+# With a handful of yearly points r alone overstates certainty, so every pair
+# also gets a p-value, a bootstrap CI and its range over rolling windows.
+CORRELATION_BOOTSTRAP = int(os.environ.get("CORRELATION_BOOTSTRAP", 2000))
+CORRELATION_CI = 95
+CORRELATION_WINDOW = 5  # years per rolling window
+CORRELATION_SEED = 7
+
+# Pearson r between every pair of columns of X (..., n, K) for each leading
+# index at once; like DataFrame.corr(), each pair uses the rows where both
+# values are present
+def batched_corr(X):
+    present = ~np.isnan(X)
+    m = present.astype('float64')
+    x = np.where(present, X, 0.0)
+    xt, mt = np.swapaxes(x, -1, -2), np.swapaxes(m, -1, -2)
+    n = mt @ m
+    sums = xt @ m            # sums[i, j]: sum of column i over rows where j is present too
+    squares = (xt * xt) @ m
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = xt @ x - sums * np.swapaxes(sums, -1, -2) / n
+        var = squares - sums * sums / n
+        r = cov / np.sqrt(var * np.swapaxes(var, -1, -2))
+    return np.clip(r, -1, 1)
+
+# Two-sided p-value of Student's t with integer degrees of freedom, from the
+# closed-form CDF (Abramowitz & Stegun 26.7.3/26.7.4), elementwise
+def t_two_sided_p(t, df):
+    t, df = np.abs(np.asarray(t, 'float64')), np.asarray(df, 'int64')
+    with np.errstate(invalid='ignore'):
+        theta = np.arctan(t / np.sqrt(np.maximum(df, 1)))
+    cos2, odd = np.cos(theta) ** 2, df % 2 == 1
+    terms = np.where(odd, (df - 1) // 2, df // 2)
+    total, term = np.zeros_like(theta), np.ones_like(theta)
+    for k in range(int(terms.max(initial=0))):
+        total += np.where(k < terms, term, 0.0)
+        # odd df: 1, 2/3, (2*4)/(3*5), ...   even df: 1, 1/2, (1*3)/(2*4), ...
+        term = term * cos2 * np.where(odd, (2 * k + 2) / (2 * k + 3), (2 * k + 1) / (2 * k + 2))
+    inside = np.where(odd, 2 / np.pi * (theta + np.sin(theta) * np.cos(theta) * total), np.sin(theta) * total)
+    return np.where(df >= 1, np.clip(1 - inside, 0, 1), np.nan)
+
+# Percentile bootstrap CI of every pair's r: all resamples are drawn and
+# correlated in one batch, and bounds are nearest-rank picks from the sorted
+# draws (resamples where r is undefined are left out)
+def bootstrap_corr_ci(values, resamples, level):
+    rng = np.random.default_rng(CORRELATION_SEED)
+    rows = rng.integers(0, len(values), size=(resamples, len(values)))
+    draws = np.sort(batched_corr(values[rows]), axis=0)  # NaN sorts last
+    defined = (~np.isnan(draws)).sum(axis=0)
+    tail = (100 - level) / 2
+    bounds = []
+    for q in (tail, 100 - tail):
+        rank = np.clip(np.ceil(defined * q / 100).astype('int64') - 1, 0, resamples - 1)
+        bound = np.take_along_axis(draws, rank[None], axis=0)[0]
+        bounds.append(np.where(defined > 0, bound, np.nan))
+    return tuple(bounds)
+
+def build_correlation_heatmap(snap):
+    stats = snap.correlation_stats()
+    fig = px.imshow(
+        snap.correlation_matrix(),
+        text_auto=True,
+        color_continuous_scale='RdBu',
+        aspect="auto",
+        labels=dict(x="Metric", y="Metric", color="Correlation")
+    )
+    fig.update_traces(
+        customdata=np.stack([stats[k] for k in ('p', 'ci_low', 'ci_high', 'rolling_low', 'rolling_high')], axis=-1),
+        hovertemplate=(
+            "%{y} vs %{x}<br>r = %{z:.3f} (p = %{customdata[0]:.2g})"
+            f"<br>{CORRELATION_CI}% bootstrap CI: %{{customdata[1]:.2f}} to %{{customdata[2]:.2f}}"
+            f"<br>{stats['window']}-year rolling r: %{{customdata[3]:.2f}} to %{{customdata[4]:.2f}}"
+            "<extra></extra>"
+        )
+    )
+    fig.update_layout(
+        margin=dict(l=20, r=20, t=20, b=20),
+        plot_bgcolor='white',
+        paper_bgcolor='white'
+    )
+    return fig
+
+# Figures addressable by id; builders take the snapshot to draw from
+FIGURE_BUILDERS = {fig_id: partial(build_trends_figure, y=y, title=title) for fig_id, y, title in TRENDS_FIGURES}
+FIGURE_BUILDERS['correlation_heatmap'] = build_correlation_heatmap
+
+# Figures are built once per snapshot (per year for YEAR_FIGURE_BUILDERS, defined
+# with the tab callbacks) and shared by every request as plain figure dicts
+def get_figure(snap, fig_id, year=None):
+    def build():
+        if year is None:
+            return FIGURE_BUILDERS[fig_id](snap).to_plotly_json()
+        return YEAR_FIGURE_BUILDERS[fig_id](snap, year).to_plotly_json()
+    return snap.cached(('figure', fig_id, year), build)
+
+# --- Data-derived insights ---
+# Narrative statements (trend direction, largest movers, strongest
+# relationships) filled into templates from the snapshot's own numbers, so the
+# text always matches the data it sits next to. Derived once per snapshot.
+INSIGHT_METRICS = {
+    'EMNC_total': ("eMNC count", "{:,.0f}"),
+    'OFDI': ("outward FDI", "${:,.0f}bn"),
+    'IFDI': ("inward FDI", "${:,.0f}bn"),
+    'Greenfield': ("greenfield investment", "${:,.0f}bn"),
+    'M_and_A': ("M&A investment", "${:,.0f}bn"),
+    'FDI_net': ("net FDI", "${:,.0f}bn"),
+    'FDI_ratio': ("inward/outward FDI ratio", "{:.2f}"),
+    'GDP_share': ("share of world GDP", "{:.1f}%"),
+    'GDP_growth': ("GDP growth", "{:.1f}%"),
+    'EMNC_share': ("eMNC share of the Fortune 500", "{:.1f}%"),
+    'Greenfield_share': ("greenfield share", "{:.1f}%"),
+    'M_and_A_share': ("M&A share", "{:.1f}%"),
+    'D_ESG': ("D-ESG score", "{:.1f}"),
+    'D_ESG_per_100eMNC': ("D-ESG per 100 eMNCs", "{:.1f}"),
+    'Billionaire_count': ("billionaire count", "{:,.0f}"),
+    'Billionaires_per_100eMNC': ("billionaires per 100 eMNCs", "{:,.0f}"),
+}
+# Percent metrics that are shares of a whole (GDP growth is a rate, not a share)
+SHARE_METRICS = {'GDP_share', 'EMNC_share', 'Greenfield_share', 'M_and_A_share'}
+
+# Columns a derived metric is computed from, found by evaluating its formula on
+# a mapping that records every key it reads
+def derived_inputs(func):
+    read = set()
+    class Recorder(dict):
+        def __getitem__(self, key):
+            read.add(key)
+            return 1.0
+    func(Recorder())
+    return frozenset(read)
+
+DERIVED_INPUTS = {name: derived_inputs(func) for name, func in DERIVED_METRICS.items()}
+# Pairs that correlate by construction: a derived metric and each of its
+# inputs, and derived metrics computed from the same inputs (greenfield and M&A
+# share, net FDI and the FDI ratio)
+DEFINITIONAL_PAIRS = {
+    frozenset((name, column)) for name, inputs in DERIVED_INPUTS.items() for column in inputs
+} | {
+    frozenset((a, b)) for a in DERIVED_INPUTS for b in DERIVED_INPUTS if a != b and DERIVED_INPUTS[a] == DERIVED_INPUTS[b]
+}
+INSIGHT_TOP_PAIRS = 5
+INSIGHT_ALPHA = 0.05
+CORRELATION_STRENGTHS = [(0.99, "near-perfect"), (0.9, "very strong"), (0.7, "strong"), (0.5, "moderate"), (0, "weak")]
+
+def metric_name(metric):
+    return INSIGHT_METRICS[metric][0] if metric in INSIGHT_METRICS else f"{metric}'s Fortune 500 count"
+
+def format_metric(metric, value):
+    return (INSIGHT_METRICS[metric][1] if metric in INSIGHT_METRICS else "{:,.0f}").format(value)
+
+# Capitalize the first word unless it is already mixed case ("eMNC")
+def sentence(text):
+    return text if text[1:2].isupper() else text[0].upper() + text[1:]
+
+def correlation_strength(r):
+    label = next(label for bound, label in CORRELATION_STRENGTHS if abs(r) >= bound)
+    return f"{label} {'positive' if r >= 0 else 'inverse'}"
+
+# Non-definitional metric pairs ordered by |r|, as (|r|, i, j)
+def ranked_pairs(stats):
+    cols, r = stats['columns'], stats['r']
+    pairs = [
+        (abs(r[i, j]), i, j) for i in range(len(cols)) for j in range(i + 1, len(cols))
+        if not np.isnan(r[i, j]) and frozenset((cols[i], cols[j])) not in DEFINITIONAL_PAIRS
+    ]
+    return sorted(pairs, reverse=True)
+
+def pair_statement(stats, i, j):
+    cols, window = stats['columns'], stats['window']
+    r, p = stats['r'][i, j], stats['p'][i, j]
+    low, high = stats['rolling_low'][i, j], stats['rolling_high'][i, j]
+    title = f"{sentence(metric_name(cols[i]))} vs. {metric_name(cols[j])}: {correlation_strength(r)} (r = {r:+.2f})"
+    if np.isnan(low):
+        stability = f"no {window}-year window has a defined r"
+    elif np.sign(low) == np.sign(high) == np.sign(r):
+        stability = f"same sign in every {window}-year window (r {low:+.2f} to {high:+.2f})"
+    else:
+        stability = f"sign changes across {window}-year windows (r {low:+.2f} to {high:+.2f})"
+    ci = f"{CORRELATION_CI}% CI {stats['ci_low'][i, j]:+.2f} to {stats['ci_high'][i, j]:+.2f}"
+    return title, f"p = {p:.2g}, {ci}; {stability}"
+
+def trend_statement(metric, first_year, first, last_year, last, cagr):
+    verb = "rose" if last >= first else "fell"
+    return (f"{sentence(metric_name(metric))} {verb} from {format_metric(metric, first)} in {first_year} "
+            f"to {format_metric(metric, last)} in {last_year} ({cagr:+.1f}% a year)")
+
+def correlation_insights(snap, stats):
+    pairs = ranked_pairs(stats)
+    first, last = snap.years[0], snap.latest_year
+    return {
+        'intro': (f"Across {first}–{last}, the strongest of {len(pairs)} relationships among the strategic "
+                  "metrics (pairs related by definition, such as eMNC count and share, are left out):"),
+        'strongest': [pair_statement(stats, i, j) for _, i, j in pairs[:INSIGHT_TOP_PAIRS]]
+    }
+
+def period_insights(snap, stats):
+    table, cagr = snap.metrics_table(), snap.cagr()
+    first_year, last_year = int(table.index[0]), int(table.index[-1])
+    first, last = table.iloc[0], table.iloc[-1]
+    levels = [m for m in table.columns if m not in PERCENT_METRICS and np.isfinite(cagr[m])]
+    insights = []
+    if 'EMNC_total' in levels:
+        insights.append(trend_statement('EMNC_total', first_year, first['EMNC_total'], last_year, last['EMNC_total'], cagr['EMNC_total']))
+    others = sorted((m for m in levels if m != 'EMNC_total'), key=lambda m: cagr[m])
+    if others:
+        fastest = others[-1]
+        insights.append(f"Fastest growth: {metric_name(fastest)}, {cagr[fastest]:+.1f}% a year "
+                        f"({format_metric(fastest, first[fastest])} to {format_metric(fastest, last[fastest])})")
+        if cagr[others[0]] < 0:
+            insights.append(trend_statement(others[0], first_year, first[others[0]], last_year, last[others[0]], cagr[others[0]]))
+    shifts = [m for m in table.columns if m in SHARE_METRICS and np.isfinite(last[m] - first[m])]
+    if shifts:
+        shift = max(shifts, key=lambda m: abs(last[m] - first[m]))
+        insights.append(f"Biggest shift in share: {metric_name(shift)}, {last[shift] - first[shift]:+.1f} pts since "
+                        f"{first_year}, to {format_metric(shift, last[shift])}")
+    mover = largest_mover(snap, last_year)
+    if mover:
+        insights.append(mover)
+    countries = snap.country_table()[list(snap.top_countries_overall())].dropna()
+    if len(countries) > 1:
+        span = int(countries.index[-1] - countries.index[0])
+        growth = ((countries.iloc[-1] / countries.iloc[0]) ** (1 / span) - 1) * 100
+        growth = growth[np.isfinite(growth)]
+        if len(growth):
+            country = growth.idxmax()
+            insights.append(f"Among the leading countries, {country}'s Fortune 500 count grew fastest: "
+                            f"{countries[country].iloc[0]:,.0f} to {countries[country].iloc[-1]:,.0f} ({growth[country]:+.1f}% a year)")
+    cols, r, pairs = stats['columns'], stats['r'], ranked_pairs(stats)
+    inverse = [(r[i, j], i, j) for _, i, j in pairs if r[i, j] <= -0.5]
+    if inverse:
+        value, i, j = min(inverse)
+        insights.append(f"Strongest inverse relationship: {metric_name(cols[i])} and {metric_name(cols[j])} (r = {value:+.2f})")
+    significant = [(i, j) for _, i, j in pairs if stats['p'][i, j] < INSIGHT_ALPHA]
+    stable = [(i, j) for i, j in significant if np.sign(stats['rolling_low'][i, j]) == np.sign(stats['rolling_high'][i, j])]
+    insights.append(f"{len(significant)} of {len(pairs)} metric pairs are significant at p < {INSIGHT_ALPHA} with "
+                    f"{len(table)} yearly observations; {len(stable)} of those keep their sign in every "
+                    f"{stats['window']}-year window")
+    return [sentence(text) + "." for text in insights]
+
+# Biggest year-over-year percent change among level metrics, or None for the first year
+def largest_mover(snap, year):
+    _, percent = snap.yoy_changes()
+    table = snap.metrics_table()
+    position = table.index.get_loc(year)
+    if position == 0:
+        return None
+    previous = table.iloc[position - 1]
+    changes = percent.loc[year, [m for m in table.columns if m not in PERCENT_METRICS and previous[m] > 0]]
+    changes = changes[np.isfinite(changes)]
+    if changes.empty:
+        return None
+    metric = changes.abs().idxmax()
+    direction = "up" if changes[metric] >= 0 else "down"
+    return (f"Largest move in {year}: {metric_name(metric)} {direction} {abs(changes[metric]):.1f}% "
+            f"from {int(table.index[position - 1])}, to {format_metric(metric, table.at[year, metric])}")
+
+# Takeaways for one year of the Overview summary
+def year_takeaways(snap, year):
+    takeaways = []
+    mover = largest_mover(snap, year)
+    if mover:
+        takeaways.append(mover)
+    names, counts, _ = snap.top_countries(year)
+    if names:
+        takeaways.append("Most Fortune 500 companies among tracked countries: " + ", ".join(f"{n} ({c:,})" for n, c in zip(names, counts)))
+    table = snap.metrics_table()
+    if {'Greenfield_share', 'M_and_A_share'} <= set(table.columns):
+        greenfield, ma = table.at[year, 'Greenfield_share'], table.at[year, 'M_and_A_share']
+        mix = f"Investment mix: {greenfield:.0f}% greenfield, {ma:.0f}% M&A"
+        position = table.index.get_loc(year)
+        if position > 0:
+            mix += f" ({greenfield - table['Greenfield_share'].iloc[position - 1]:+.1f} pts greenfield from {int(table.index[position - 1])})"
+        takeaways.append(mix)
+    return [text + "." for text in takeaways]
+
+def derive_insights(snap):
+    def compute():
+        stats = snap.correlation_stats()
+        return {
+            **correlation_insights(snap, stats),
+            'insights': period_insights(snap, stats),
+            'takeaways': {year: year_takeaways(snap, year) for year in snap.years}
+        }
+    return snap.cached('insights', compute)
+
+# --- Fast JSON serialization ---
+# Opt-in with FAST_JSON=1 (needs orjson). Dash encodes the layout and every
+# callback response with plotly's to_json, which walks component trees in
+# Python; here orjson does the walk, writes NumPy arrays directly and only
+# calls back into Python for components, Patches and the odd value plotly's
+# encoder knows about. bench_serialization.py compares the two. Dash has no
+# serializer setting, so this replaces the to_json its modules import; a Dash
+# upgrade that moves it leaves the default serializer in place, with a warning.
+FAST_JSON = os.environ.get("FAST_JSON", "0").lower() in ("1", "true", "yes")
+
+# Same escaping as plotly.io.json, so output can still be inlined in HTML
+_JSON_ESCAPES = (('<', '\\u003c'), ('>', '\\u003e'), ('/', '\\u002f'), ('\u2028', '\\u2028'), ('\u2029', '\\u2029'))
+_plotly_json_encoder = PlotlyJSONEncoder()
+
+def _json_default(obj):
+    to_plotly_json = getattr(obj, 'to_plotly_json', None)
+    if to_plotly_json is not None:
+        return to_plotly_json()
+    # Non-contiguous arrays, pandas and datetime values, ...
+    return _plotly_json_encoder.default(obj)
+
+def fast_to_json(value):
+    out = orjson.dumps(value, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode()
+    for char, escaped in _JSON_ESCAPES:
+        if char in out:
+            out = out.replace(char, escaped)
+    return out
+
+# Modules that import dash._utils.to_json by name and use it for responses
+FAST_JSON_TARGETS = ('dash._callback', 'dash.dash')
+
+def install_fast_json():
+    import dash._utils
+    modules = []
+    for name in FAST_JSON_TARGETS:
+        try:
+            module = importlib.import_module(name)
+        except ImportError:
+            module = None
+        if getattr(module, 'to_json', None) not in (dash._utils.to_json, fast_to_json):
+            return f"{name}.to_json is not Dash's serializer"
+        modules.append(module)
+    for module in modules:
+        module.to_json = fast_to_json
+    return None
+
 # Initialize Dash app
-app = dash.Dash(__name__, external_stylesheets=external_stylesheets, suppress_callback_exceptions=True)
+# Multi-page: every tab is its own route, registered inline (see Pages below)
+app = dash.Dash(__name__, external_stylesheets=external_stylesheets, suppress_callback_exceptions=True,
+                use_pages=True, pages_folder="")
+server = app.server  # WSGI entry point, e.g. gunicorn cornell3:server
+
+if FAST_JSON:
+    fast_json_problem = "orjson is not installed" if orjson is None else install_fast_json()
+    if fast_json_problem:
+        app.logger.warning("FAST_JSON is set but %s; using Dash's default serializer", fast_json_problem)
 
 app.index_string = '''
 <!DOCTYPE html>
@@ -336,6 +1268,15 @@ app.index_string = '''
                 padding: 1.5rem;
             }
             
+            /* Card factory styles (see tile / panel_row), shared instead of inline styles */
+            .text-brand {
+                color: ''' + COLORS['primary'] + ''';
+            }
+
+            .card-tile {
+                background-color: ''' + COLORS['secondary'] + ''';
+            }
+
             /* Graph container styles */
             .graph-container {
                 width: 100%;
@@ -409,6 +1350,250 @@ app.index_string = '''
 </html>
 '''
 
+# Download links for the export endpoint below
+def export_links(fig_id):
+    links = []
+    for fmt in EXPORT_FORMATS:
+        if links:
+            links.append(html.Span("·", className="mx-2 text-muted"))
+        links.append(html.A(fmt.upper(), href=f"/export/{fig_id}.{fmt}?download=1", className="text-muted"))
+    links += [
+        html.Span("·", className="mx-2 text-muted"),
+        html.A("Embed", href=f"/embed/{fig_id}", target="_blank", className="text-muted")
+    ]
+    return html.Div([html.Small("Export: ", className="text-muted")] + links, className="text-end small mb-3")
+
+# --- Data downloads ---
+# The tables behind the charts as CSV, Parquet or XLSX. Files are produced in
+# DOWNLOAD_CHUNK_ROWS-row chunks and streamed as they are written, so a large
+# export is never held in memory as one file.
+DOWNLOAD_CHUNK_ROWS = int(os.environ.get("DOWNLOAD_CHUNK_ROWS", 50_000))
+
+# Metrics with their source dtypes (counts stay integers), the same in both
+# storage modes: compact columns are widened back and derived metrics are
+# computed from the widened base columns
+def metrics_download(snap):
+    base = snap.df.astype({'year': 'int64'})
+    base = base.astype({c: 'int64' if pd.api.types.is_integer_dtype(base[c]) else 'float64'
+                        for c in base if c != 'year'})
+    frame = add_derived_metrics(base).sort_values('year', ignore_index=True)
+    return frame[['year'] + snap.metric_columns]
+
+DOWNLOAD_DATASETS = {
+    'metrics': ("Metrics (with derived columns)", metrics_download),
+    'countries': ("Fortune 500 by country", lambda snap: snap.country_ranks[['year', 'country', 'count']]),
+    'correlations': ("Correlation matrix", lambda snap: snap.correlation_matrix().rename_axis('metric').reset_index())
+}
+
+def frame_chunks(frame):
+    for start in range(0, len(frame), DOWNLOAD_CHUNK_ROWS):
+        yield frame.iloc[start:start + DOWNLOAD_CHUNK_ROWS]
+
+def stream_csv(frame):
+    yield frame.iloc[:0].to_csv(index=False).encode()
+    for chunk in frame_chunks(frame):
+        yield chunk.to_csv(index=False, header=False).encode()
+
+# File-like sink that hands written bytes back to a generator
+class _ByteSink:
+    def __init__(self):
+        self.closed = False
+        self._parts = []
+        self._position = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data, self._parts = b''.join(self._parts), []
+        return data
+
+def stream_parquet(frame):
+    # One row group per chunk, sent as soon as it is encoded
+    sink = _ByteSink()
+    schema = pa.Schema.from_pandas(frame, preserve_index=False)
+    with pq.ParquetWriter(sink, schema) as writer:
+        for chunk in frame_chunks(frame):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            yield sink.drain()
+    yield sink.drain()
+
+def stream_xlsx(frame):
+    # XLSX is a zip finished on close, so it is built in a temp file; in
+    # constant_memory mode each row is flushed to disk as soon as it is written
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+        sheet = workbook.add_worksheet()
+        sheet.write_row(0, 0, [str(c) for c in frame.columns])
+        row = 1
+        for chunk in frame_chunks(frame):
+            # Missing values become empty cells
+            for values in chunk.astype(object).where(chunk.notna(), None).itertuples(index=False):
+                sheet.write_row(row, 0, values)
+                row += 1
+        workbook.close()
+        with open(path, 'rb') as f:
+            yield from iter(partial(f.read, 1 << 16), b'')
+    finally:
+        os.remove(path)
+
+DOWNLOAD_FORMATS = {
+    'csv': ('text/csv', stream_csv, lambda: True),
+    'parquet': ('application/vnd.apache.parquet', stream_parquet, lambda: pq is not None),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', stream_xlsx, lambda: xlsxwriter is not None)
+}
+
+def available_download_formats():
+    return [fmt for fmt, (_, _, available) in DOWNLOAD_FORMATS.items() if available()]
+
+@app.server.route("/download/<dataset>.<fmt>")
+def download_data(dataset, fmt):
+    if dataset not in DOWNLOAD_DATASETS or fmt not in DOWNLOAD_FORMATS:
+        abort(404)
+    mimetype, stream, available = DOWNLOAD_FORMATS[fmt]
+    if not available():
+        # pyarrow / xlsxwriter is not installed
+        abort(503)
+    snap = current_snapshot()
+    frame = DOWNLOAD_DATASETS[dataset][1](snap)
+    return Response(
+        stream(frame),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{dataset}-{snap.version}.{fmt}"'}
+    )
+
+# Navbar menu linking to the streaming data downloads
+def download_menu():
+    items = []
+    for dataset, (label, _) in DOWNLOAD_DATASETS.items():
+        if items:
+            items.append(dbc.DropdownMenuItem(divider=True))
+        items.append(dbc.DropdownMenuItem(label, header=True))
+        items += [
+            dbc.DropdownMenuItem(fmt.upper(), href=f"/download/{dataset}.{fmt}", external_link=True)
+            for fmt in available_download_formats()
+        ]
+    return dbc.DropdownMenu(items, label="Download data", color="light", size="sm", align_end=True, className="ms-auto")
+
+# --- Cards and panels ---
+# Card trees are built from compact specs. Their styling is the shared
+# .text-brand / .card-tile CSS classes rather than a style dict per component,
+# and subtrees that never change are built once and reused.
+PANEL_CLASS = "shadow mb-4 animate__animated animate__fadeInUp border-0"
+
+def card_title(title, size=html.H5):
+    return size(title, className="card-title text-brand")
+
+# Gray card in a half-width (lg) column
+def tile(title, *children, lg=6):
+    return dbc.Col([
+        dbc.Card(dbc.CardBody([card_title(title), *children]), class_name="card-tile mb-3 border-0")
+    ], width=12, lg=lg)
+
+# Full-width white section card with a heading
+def panel(title, *children):
+    return dbc.Card(dbc.CardBody([card_title(title, html.H4), *children]), class_name=PANEL_CLASS)
+
+def panel_row(title, *children):
+    return dbc.Row([dbc.Col([panel(title, *children)], width=12)])
+
+def metric_card(label, value, delta):
+    return dbc.Col([
+        dbc.Card(
+            dbc.CardBody([
+                html.H5(label, className="card-title"),
+                html.P(value, className="card-text h4 text-brand"),
+                delta
+            ]),
+            class_name="mb-3"
+        )
+    ], width=6)
+
+# Static Future tab sections: (title, [(tile title, summary, bullets), ...]);
+# a summary adds the "Focus Areas:" caption above the bullets
+FUTURE_SECTIONS = (
+    ("Strategic Focus Areas", (
+        ("Digital Transformation", None, ("AI and automation integration", "Digital platform development",
+                                          "Cybersecurity enhancement", "Data analytics capabilities")),
+        ("Sustainability", None, ("Green technology investments", "Carbon footprint reduction",
+                                  "Sustainable supply chains", "ESG reporting standards")),
+        ("Market Expansion", None, ("Emerging market penetration", "Strategic partnerships",
+                                    "Local market adaptation", "Cross-border innovation")),
+        ("Risk Management", None, ("Geopolitical scenario planning", "Currency risk mitigation",
+                                   "Supply chain resilience", "Regulatory compliance"))
+    )),
+    ("Key Opportunities", (
+        ("Technology & Innovation", "Leverage AI and digital platforms for scale and efficiency",
+         ("AI-driven process optimization", "Digital ecosystem development",
+          "Smart manufacturing solutions", "Data-driven decision making")),
+        ("Sustainable Growth", "Capture green investment opportunities and sustainable practices",
+         ("Renewable energy projects", "Circular economy initiatives",
+          "Green infrastructure development", "Sustainable product innovation"))
+    ))
+)
+
+def bullet_tile(title, summary, bullets):
+    children = []
+    if summary:
+        children += [html.P(summary, className="card-text"), html.Small("Focus Areas:", className="text-muted d-block")]
+    return tile(title, *children, html.Ul([html.Li(item) for item in bullets], className="mb-0"))
+
+# Built once per process: the content does not depend on the data
+@lru_cache(maxsize=None)
+def future_sections():
+    return [
+        panel_row(title, html.Div([
+            dbc.Row([bullet_tile(*spec) for spec in tiles[i:i + 2]]) for i in range(0, len(tiles), 2)
+        ]))
+        for title, tiles in FUTURE_SECTIONS
+    ]
+
+# Future tab projection card; the latest actual value and the change to the
+# target come from the snapshot's precomputed projection deltas
+def projection_card(snap, spec):
+    title, _, headline, projected, _, value_format = spec
+    actual, change = snap.projection_deltas()[title]
+    steps = []
+    for year, value in projected.items():
+        steps += [
+            html.Span("→", className="mx-2"),
+            html.Small(f"{year}: {value_format.format(value)}", className="text-muted")
+        ]
+    return tile(
+        title,
+        html.P(headline, className="card-text"),
+        html.Small(change, className="text-success" if change.startswith("↑") else "text-danger"),
+        html.Div([
+            html.Small(f"{snap.latest_year}: {value_format.format(actual)}", className="text-muted"),
+            html.Div(steps, className="d-flex justify-content-between mt-2")
+        ]),
+        lg=4
+    )
+
+TABS = [
+    ("overview", "Overview"),
+    ("trends", "Trends"),
+    ("distribution", "Distribution"),
+    ("macro", "Macro & ESG"),
+    ("correlations", "Correlations"),
+    ("future", "Future")
+]
+TAB_IDS = [tab for tab, _ in TABS]
+TAB_PATHS = {tab: "/" if tab == "overview" else f"/{tab}" for tab in TAB_IDS}
+
 # App Layout
 app.layout = html.Div([
     dbc.Navbar(
@@ -423,7 +1608,8 @@ app.layout = html.Div([
                         'fontSize': '1.5rem',
                         'fontWeight': 'bold'
                     }
-                )
+                ),
+                download_menu()
             ],
             fluid=True,
         ),
@@ -433,25 +1619,20 @@ app.layout = html.Div([
     ),
     dbc.Container(
         [
-            # Main Tabs
-            dbc.Tabs(
-                id="tabs",
-                active_tab="overview",
-                className="nav-fill w-100 mb-4",
-                children=[
-                    dbc.Tab(label="Overview", tab_id="overview"),
-                    dbc.Tab(label="Trends", tab_id="trends"),
-                    dbc.Tab(label="Distribution", tab_id="distribution"),
-                    dbc.Tab(label="Macro & ESG", tab_id="macro"),
-                    dbc.Tab(label="Correlations", tab_id="correlations"),
-                    dbc.Tab(label="Future", tab_id="future"),
-                ],
+            # Main navigation, one link per page
+            dbc.Nav(
+                [dbc.NavLink(label, href=dash.get_relative_path(TAB_PATHS[tab]), active="exact") for tab, label in TABS],
+                fill=True,
+                className="nav-tabs w-100 mb-4"
             ),
+            # One pane per page, filled the first time the page is opened (see Pages)
+            dcc.Location(id="page_url"),
+            dcc.Store(id="mounted_pages", data=[]),
             dcc.Loading(
                 id="loading-content",
                 type="circle",
                 color=COLORS['primary'],
-                children=html.Div(id="content")
+                children=html.Div([dash.page_container] + [html.Div(id=f"page-{tab}") for tab in TAB_IDS], id="content")
             )
         ],
         fluid=True,
@@ -459,19 +1640,25 @@ app.layout = html.Div([
     )
 ], className="w-100 h-100 m-0 p-0")
 
-# Callback: Render Content for Tabs
-@app.callback(Output("content", "children"), Input("tabs", "active_tab"))
-def render_content(active_tab):
+# Tab layouts are built once per snapshot and reused for every render. Content
+# is always for the latest year; selected_year (from a ?year= link) only
+# preselects the dropdown, and the year callback fills in that year.
+def build_tab_content(snap, active_tab, selected_year=None):
+    df = snap.df
     if active_tab == "overview":
+        year = snap.latest_year
+        year_data = snap.year_row(year)
         return dbc.Container([
             dbc.Row([
                 dbc.Col([
                     html.Label("Select Year:", className="h5 mb-2"),
                     dcc.Dropdown(
                         id='overview_year',
-                        options=[{'label': y, 'value': y} for y in df.year],
-                        value=2024,
+                        options=[{'label': y, 'value': y} for y in snap.years],
+                        value=selected_year or year,
                         clearable=False,
+                        persistence=True,
+                        persistence_type='session',
                         className="mb-3"
                     ),
                 ], xs=12),
@@ -481,7 +1668,7 @@ def render_content(active_tab):
                     dbc.Card(
                         dbc.CardBody([
                             html.H4("Yearly Summary", className="card-title"),
-                            html.Div(id='overview_text', className="overview-text")
+                            html.Div(overview_text_content(snap, year), id='overview_text', className="overview-text")
                         ]),
                         className="mb-3"
                     )
@@ -490,7 +1677,7 @@ def render_content(active_tab):
                     dbc.Card(
                         dbc.CardBody([
                             html.H4("Key Metrics", className="card-title"),
-                            html.Div(id='overview_metrics')
+                            html.Div(overview_metrics_content(snap, year, year_data), id='overview_metrics')
                         ]),
                         className="mb-3"
                     )
@@ -504,6 +1691,7 @@ def render_content(active_tab):
                             html.Div(
                                 dcc.Graph(
                                     id='overview_countries',
+                                    figure=get_figure(snap, 'overview_countries', year),
                                     config={'displayModeBar': False, 'responsive': True}
                                 ),
                                 className="graph-container"
@@ -519,6 +1707,7 @@ def render_content(active_tab):
                             html.Div(
                                 dcc.Graph(
                                     id='overview_fdi',
+                                    figure=get_figure(snap, 'overview_fdi', year),
                                     config={'displayModeBar': False, 'responsive': True}
                                 ),
                                 className="graph-container"
@@ -530,29 +1719,27 @@ def render_content(active_tab):
             ])
         ], fluid=True, className="px-3")
     elif active_tab == "trends":
-        figs = [
-            px.line(df, x='year', y=['USA','China','India'], title="Fortune Global 500 Counts"),
-            px.line(df, x='year', y='EMNC_total', title="Total Emerging Market MNCs"),
-            px.line(df, x='year', y='Billionaire_count', title="Global Billionaires"),
-            px.line(df, x='year', y=['OFDI','IFDI'], title="FDI Flows (bn USD)"),
-            px.line(df, x='year', y=['Greenfield','M_and_A'], title="Greenfield vs M&A (bn USD)"),
-            px.line(df, x='year', y='FDI_net', title="FDI Net (bn USD)"),
-            px.line(df, x='year', y='FDI_ratio', title="FDI Ratio (In/Out)"),
-            px.line(df, x='year', y=['Greenfield_share','M_and_A_share'], title="Greenfield vs M&A Share (%)"),
-            px.line(df, x='year', y='D_ESG_per_100eMNC', title="D-ESG per 100 eMNCs (%)"),
-            px.line(df, x='year', y='Billionaires_per_100eMNC', title="Billionaires per 100 eMNCs (%)")
-        ]
-        return dbc.Row([dbc.Col(dcc.Graph(figure=fig, config={'displayModeBar': False}), width=12) for fig in figs])
+        return dbc.Row([
+            dbc.Col([
+                dcc.Graph(figure=get_figure(snap, fig_id), config={'displayModeBar': False}),
+                export_links(fig_id)
+            ], width=12) for fig_id, _, _ in TRENDS_FIGURES
+        ] + ([dbc.Col([series_panel(snap)], width=12)] if snap.series else [])
+          + ([dbc.Col([edition_panel(snap)], width=12)] if snap.editions_df is not None else []))
     elif active_tab == "distribution":
+        year = snap.latest_year
+        row = snap.year_row(year)
         return dbc.Container([
             dbc.Row([
                 dbc.Col([
                     html.Label("Select Year:", className="h5", style={'fontFamily': FONT_FAMILY}),
                     dcc.Dropdown(
                         id='dist_year',
-                        options=[{'label': y, 'value': y} for y in df.year],
-                        value=2024,
+                        options=[{'label': y, 'value': y} for y in snap.years],
+                        value=selected_year or year,
                         clearable=False,
+                        persistence=True,
+                        persistence_type='session',
                         className="mb-3"
                     ),
                 ], width=12),
@@ -563,7 +1750,7 @@ def render_content(active_tab):
                         dbc.CardBody([
                             html.H4("eMNC Distribution by Country", className="card-title"),
                             html.Div(
-                                dcc.Graph(id='pie1', config={'displayModeBar': False}),
+                                dcc.Graph(id='pie1', figure=get_figure(snap, 'pie1', year), config={'displayModeBar': False}),
                                 className="graph-container"
                             )
                         ]),
@@ -575,7 +1762,7 @@ def render_content(active_tab):
                         dbc.CardBody([
                             html.H4("FDI Distribution", className="card-title"),
                             html.Div(
-                                dcc.Graph(id='pie2', config={'displayModeBar': False}),
+                                dcc.Graph(id='pie2', figure=get_figure(snap, 'pie2', year), config={'displayModeBar': False}),
                                 className="graph-container"
                             )
                         ]),
@@ -589,7 +1776,7 @@ def render_content(active_tab):
                         dbc.CardBody([
                             html.H4("Investment Type Distribution", className="card-title"),
                             html.Div(
-                                dcc.Graph(id='pie3', config={'displayModeBar': False}),
+                                dcc.Graph(id='pie3', figure=get_figure(snap, 'pie3', year), config={'displayModeBar': False}),
                                 className="graph-container"
                             )
                         ]),
@@ -600,7 +1787,7 @@ def render_content(active_tab):
                     dbc.Card(
                         dbc.CardBody([
                             html.H4("Key Metrics Distribution", className="card-title"),
-                            html.Div(id='distribution_metrics')
+                            html.Div(distribution_metrics_content(snap, year, row), id='distribution_metrics')
                         ]),
                         class_name="shadow mb-4 animate__animated animate__fadeInUp"
                     )
@@ -647,7 +1834,7 @@ def render_content(active_tab):
                     dbc.Card(
                         dbc.CardBody([
                             html.Div(
-                                dcc.Graph(figure=px.bar(df, x='year', y='EMNC_share', title="eMNCs as % of Fortune 500"), config={'displayModeBar': False}),
+                                dcc.Graph(figure=px.bar(snap.metrics_frame(['EMNC_share']), x='year', y='EMNC_share', title="eMNCs as % of Fortune 500"), config={'displayModeBar': False}),
                                 className="graph-container"
                             )
                         ]),
@@ -667,7 +1854,8 @@ def render_content(active_tab):
                             html.Div(
                                 dcc.Graph(id='correlation_heatmap', config={'displayModeBar': False}),
                                 className="graph-container"
-                            )
+                            ),
+                            export_links('correlation_heatmap')
                         ]),
                         class_name="shadow mb-4 animate__animated animate__fadeInUp"
                     )
@@ -697,270 +1885,133 @@ def render_content(active_tab):
     elif active_tab == "future":
         return dbc.Container([
             # Projections Section
+            panel_row("2025-2026 Projections", html.Div([
+                dbc.Row([projection_card(snap, spec) for spec in FUTURE_PROJECTIONS])
+            ])),
+            # Scenario Simulator
             dbc.Row([
-                dbc.Col([
-                    dbc.Card(
-                        dbc.CardBody([
-                            html.H4("2025-2026 Projections", className="card-title", style={'color': COLORS['primary']}),
-                            html.Div([
-                                dbc.Row([
-                                    dbc.Col([
-                                        dbc.Card(
-                                            dbc.CardBody([
-                                                html.H5("eMNC Growth", className="card-title", style={'color': COLORS['primary']}),
-                                                html.P("Projected to reach 120 by 2026", className="card-text"),
-                                                html.Small("↑ 26% from 2024", className="text-success"),
-                                                html.Div([
-                                                    html.Small("2024: 95", className="text-muted"),
-                                                    html.Div([
-                                                        html.Span("→", className="mx-2"),
-                                                        html.Small("2025: 108", className="text-muted"),
-                                                        html.Span("→", className="mx-2"),
-                                                        html.Small("2026: 120", className="text-muted")
-                                                    ], className="d-flex justify-content-between mt-2")
-                                                ])
-                                            ]),
-                                            class_name="mb-3 border-0",
-                                            style={'background-color': COLORS['secondary']}
-                                        )
-                                    ], width=12, lg=4),
-                                    dbc.Col([
-                                        dbc.Card(
-                                            dbc.CardBody([
-                                                html.H5("ESG Performance", className="card-title", style={'color': COLORS['primary']}),
-                                                html.P("Target score of 75 by 2025", className="card-text"),
-                                                html.Small("↑ 19% from 2024", className="text-success"),
-                                                html.Div([
-                                                    html.Small("2024: 63", className="text-muted"),
-                                                    html.Div([
-                                                        html.Span("→", className="mx-2"),
-                                                        html.Small("2025: 75", className="text-muted"),
-                                                        html.Span("→", className="mx-2"),
-                                                        html.Small("2026: 82", className="text-muted")
-                                                    ], className="d-flex justify-content-between mt-2")
-                                                ])
-                                            ]),
-                                            class_name="mb-3 border-0",
-                                            style={'background-color': COLORS['secondary']}
-                                        )
-                                    ], width=12, lg=4),
-                                    dbc.Col([
-                                        dbc.Card(
-                                            dbc.CardBody([
-                                                html.H5("Greenfield Investment", className="card-title", style={'color': COLORS['primary']}),
-                                                html.P("Expected to reach 45% share", className="card-text"),
-                                                html.Small("↑ 5% from 2024", className="text-success"),
-                                                html.Div([
-                                                    html.Small("2024: 40%", className="text-muted"),
-                                                    html.Div([
-                                                        html.Span("→", className="mx-2"),
-                                                        html.Small("2025: 43%", className="text-muted"),
-                                                        html.Span("→", className="mx-2"),
-                                                        html.Small("2026: 45%", className="text-muted")
-                                                    ], className="d-flex justify-content-between mt-2")
-                                                ])
-                                            ]),
-                                            class_name="mb-3 border-0",
-                                            style={'background-color': COLORS['secondary']}
-                                        )
-                                    ], width=12, lg=4)
-                                ])
-                            ])
-                        ]),
-                        class_name="shadow mb-4 animate__animated animate__fadeInUp border-0",
-                        style={'background-color': 'white'}
-                    )
-                ], width=12),
+                dbc.Col([scenario_panel(snap)], width=12),
             ]),
-            # Strategic Focus Areas
-            dbc.Row([
-                dbc.Col([
-                    dbc.Card(
-                        dbc.CardBody([
-                            html.H4("Strategic Focus Areas", className="card-title", style={'color': COLORS['primary']}),
-                            html.Div([
-                                dbc.Row([
-                                    dbc.Col([
-                                        dbc.Card(
-                                            dbc.CardBody([
-                                                html.H5("Digital Transformation", className="card-title", style={'color': COLORS['primary']}),
-                                                html.Ul([
-                                                    html.Li("AI and automation integration"),
-                                                    html.Li("Digital platform development"),
-                                                    html.Li("Cybersecurity enhancement"),
-                                                    html.Li("Data analytics capabilities")
-                                                ], className="mb-0")
-                                            ]),
-                                            class_name="mb-3 border-0",
-                                            style={'background-color': COLORS['secondary']}
-                                        )
-                                    ], width=12, lg=6),
-                                    dbc.Col([
-                                        dbc.Card(
-                                            dbc.CardBody([
-                                                html.H5("Sustainability", className="card-title", style={'color': COLORS['primary']}),
-                                                html.Ul([
-                                                    html.Li("Green technology investments"),
-                                                    html.Li("Carbon footprint reduction"),
-                                                    html.Li("Sustainable supply chains"),
-                                                    html.Li("ESG reporting standards")
-                                                ], className="mb-0")
-                                            ]),
-                                            class_name="mb-3 border-0",
-                                            style={'background-color': COLORS['secondary']}
-                                        )
-                                    ], width=12, lg=6)
-                                ]),
-                                dbc.Row([
-                                    dbc.Col([
-                                        dbc.Card(
-                                            dbc.CardBody([
-                                                html.H5("Market Expansion", className="card-title", style={'color': COLORS['primary']}),
-                                                html.Ul([
-                                                    html.Li("Emerging market penetration"),
-                                                    html.Li("Strategic partnerships"),
-                                                    html.Li("Local market adaptation"),
-                                                    html.Li("Cross-border innovation")
-                                                ], className="mb-0")
-                                            ]),
-                                            class_name="mb-3 border-0",
-                                            style={'background-color': COLORS['secondary']}
-                                        )
-                                    ], width=12, lg=6),
-                                    dbc.Col([
-                                        dbc.Card(
-                                            dbc.CardBody([
-                                                html.H5("Risk Management", className="card-title", style={'color': COLORS['primary']}),
-                                                html.Ul([
-                                                    html.Li("Geopolitical scenario planning"),
-                                                    html.Li("Currency risk mitigation"),
-                                                    html.Li("Supply chain resilience"),
-                                                    html.Li("Regulatory compliance")
-                                                ], className="mb-0")
-                                            ]),
-                                            class_name="mb-3 border-0",
-                                            style={'background-color': COLORS['secondary']}
-                                        )
-                                    ], width=12, lg=6)
-                                ])
-                            ])
-                        ]),
-                        class_name="shadow mb-4 animate__animated animate__fadeInUp border-0",
-                        style={'background-color': 'white'}
-                    )
-                ], width=12),
-            ]),
-            # Key Opportunities
-            dbc.Row([
-                dbc.Col([
-                    dbc.Card(
-                        dbc.CardBody([
-                            html.H4("Key Opportunities", className="card-title", style={'color': COLORS['primary']}),
-                            html.Div([
-                                dbc.Row([
-                                    dbc.Col([
-                                        dbc.Card(
-                                            dbc.CardBody([
-                                                html.H5("Technology & Innovation", className="card-title", style={'color': COLORS['primary']}),
-                                                html.P("Leverage AI and digital platforms for scale and efficiency", className="card-text"),
-                                                html.Small("Focus Areas:", className="text-muted d-block"),
-                                                html.Ul([
-                                                    html.Li("AI-driven process optimization"),
-                                                    html.Li("Digital ecosystem development"),
-                                                    html.Li("Smart manufacturing solutions"),
-                                                    html.Li("Data-driven decision making")
-                                                ], className="mb-0")
-                                            ]),
-                                            class_name="mb-3 border-0",
-                                            style={'background-color': COLORS['secondary']}
-                                        )
-                                    ], width=12, lg=6),
-                                    dbc.Col([
-                                        dbc.Card(
-                                            dbc.CardBody([
-                                                html.H5("Sustainable Growth", className="card-title", style={'color': COLORS['primary']}),
-                                                html.P("Capture green investment opportunities and sustainable practices", className="card-text"),
-                                                html.Small("Focus Areas:", className="text-muted d-block"),
-                                                html.Ul([
-                                                    html.Li("Renewable energy projects"),
-                                                    html.Li("Circular economy initiatives"),
-                                                    html.Li("Green infrastructure development"),
-                                                    html.Li("Sustainable product innovation")
-                                                ], className="mb-0")
-                                            ]),
-                                            class_name="mb-3 border-0",
-                                            style={'background-color': COLORS['secondary']}
-                                        )
-                                    ], width=12, lg=6)
-                                ])
-                            ])
-                        ]),
-                        class_name="shadow mb-4 animate__animated animate__fadeInUp border-0",
-                        style={'background-color': 'white'}
-                    )
-                ], width=12),
-            ])
+            # Strategic Focus Areas and Key Opportunities
+            *future_sections()
         ], fluid=True)
     return ""
 
-# Callback: Update Overview Text
-@app.callback(
-    Output('overview_text', 'children'),
-    Input('overview_year', 'value')
-)
-def update_overview_text(year):
-    summary = summaries.get(year, "")
-    # Convert markdown-style formatting to HTML
-    summary = summary.replace("**", "")
-    return html.Div([
-        html.P(line, style={'marginBottom': '1rem'}) for line in summary.split('\n') if line.strip()
-    ])
+# --- Pages ---
+# Each tab is a page at TAB_PATHS (the overview is home), so /distribution?year=2020
+# opens that page with the year preselected. Dash's page router only sets the
+# title: every page has its own pane, filled from the server the first time the
+# page is opened and afterwards just shown or hidden in the browser, so going
+# back to a page keeps its state and re-runs none of its callbacks. Only opened
+# pages are built and sent; a layout is cached per snapshot and preselected year.
+YEAR_PAGES = ('overview', 'distribution')
 
-# Callback: Update Overview Metrics
-@app.callback(
-    Output('overview_metrics', 'children'),
-    Input('overview_year', 'value')
+def page_year(snap, value):
+    try:
+        year = int(value)
+    except (TypeError, ValueError):
+        return None
+    return year if year in snap.years and year != snap.latest_year else None
+
+def page_layout(tab, year=None):
+    snap = current_snapshot()
+    year = page_year(snap, year) if tab in YEAR_PAGES else None
+    return snap.cached(('tab', tab, year), lambda: build_tab_content(snap, tab, year))
+
+for order, (tab, label) in enumerate(TABS):
+    dash.register_page(tab, path=TAB_PATHS[tab], name=label, order=order, layout=html.Div())
+
+# Callback (clientside): Switch Pages. Shows the pane of the page in the URL
+# and hides the rest; a page opened for the first time is added to
+# mounted_pages, which mounts it.
+app.clientside_callback(
+    r"""
+    function(pathname, mounted) {
+        var tabs = %s;
+        var paths = %s;
+        var active = paths[pathname && pathname.length > 1 ? pathname.replace(/\/$/, '') : pathname];
+        var styles = tabs.map(function(tab) { return tab === active ? {} : {display: 'none'}; });
+        var newly = active !== undefined && (mounted || []).indexOf(active) === -1;
+        return [newly ? (mounted || []).concat([active]) : window.dash_clientside.no_update].concat(styles);
+    }
+    """ % (json.dumps(TAB_IDS), json.dumps({dash.get_relative_path(path): tab for tab, path in TAB_PATHS.items()})),
+    Output("mounted_pages", "data"),
+    *[Output(f"page-{tab}", "style") for tab in TAB_IDS],
+    Input("page_url", "pathname"),
+    State("mounted_pages", "data")
 )
-def update_overview_metrics(year):
-    year_data = df[df['year'] == year].iloc[0]
-    metrics = [
-        ("Total eMNCs", f"{year_data['EMNC_total']}"),
-        ("Global GDP Share", f"{year_data['GDP_share']:.1f}%"),
-        ("GDP Growth", f"{year_data['GDP_growth']:.1f}%"),
-        ("ESG Score", f"{year_data['D_ESG']}"),
-        ("Billionaire Count", f"{year_data['Billionaire_count']:,}"),
-        ("FDI Net Flow", f"${year_data['FDI_net']}B"),
-        ("Greenfield Share", f"{year_data['Greenfield_share']:.1f}%"),
-        ("M&A Share", f"{year_data['M_and_A_share']:.1f}%")
-    ]
-    
-    return dbc.Row([
-        dbc.Col([
-            dbc.Card(
-                dbc.CardBody([
-                    html.H5(label, className="card-title"),
-                    html.P(value, className="card-text h4", style={'color': COLORS['primary']})
-                ]),
-                class_name="mb-3"
-            )
-        ], width=6) for label, value in metrics
-    ])
 
-# Callback: Update Overview Countries
+# Callback: Mount a Page (first visit only), with the ?year= of the URL it was opened with
 @app.callback(
-    Output('overview_countries', 'figure'),
-    Input('overview_year', 'value')
+    *[Output(f"page-{tab}", "children") for tab in TAB_IDS],
+    Input("mounted_pages", "data"),
+    State("page_url", "search"),
+    prevent_initial_call=True
 )
-def update_overview_countries(year):
-    year_data = df[df['year'] == year].iloc[0]
+def mount_page(mounted, search):
+    tab = mounted[-1] if mounted else None
+    if tab not in TAB_IDS:
+        raise PreventUpdate
+    year = urllib.parse.parse_qs((search or '').lstrip('?')).get('year', [None])[0]
+    content = page_layout(tab, year)
+    return [content if t == tab else dash.no_update for t in TAB_IDS]
+
+# /overview links keep working (with their query string) as the home page
+@app.server.route("/overview")
+def overview_page():
+    query = request.query_string.decode()
+    return redirect(dash.get_relative_path("/") + (f"?{query}" if query else ""))
+
+# Overview tab building blocks, shared by the initial layout and the year callback
+OVERVIEW_FDI = ['OFDI', 'IFDI']
+
+# Report summary for the year, followed by takeaways derived from the data
+def overview_text_content(snap, year):
+    def build():
+        summary = summaries.get(year, "")
+        # Convert markdown-style formatting to HTML
+        summary = summary.replace("**", "")
+        return html.Div([
+            html.P(line, className="mb-3") for line in summary.split('\n') if line.strip()
+        ] + [
+            html.H6("By the numbers", className="text-brand mt-2"),
+            html.Ul([html.Li(text) for text in derive_insights(snap)['takeaways'].get(year, [])])
+        ])
+    return snap.cached(('overview_text', year), build)
+
+def overview_metrics_content(snap, year, year_data):
+    return snap.cached(('overview_metrics', year), lambda: metric_cards(snap, year, [
+        ("Total eMNCs", f"{year_data['EMNC_total']}", 'EMNC_total'),
+        ("Global GDP Share", f"{year_data['GDP_share']:.1f}%", 'GDP_share'),
+        ("GDP Growth", f"{year_data['GDP_growth']:.1f}%", 'GDP_growth'),
+        ("ESG Score", f"{year_data['D_ESG']}", 'D_ESG'),
+        ("Billionaire Count", f"{year_data['Billionaire_count']:,}", 'Billionaire_count'),
+        ("FDI Net Flow", f"${year_data['FDI_net']}B", 'FDI_net'),
+        ("Greenfield Share", f"{year_data['Greenfield_share']:.1f}%", 'Greenfield_share'),
+        ("M&A Share", f"{year_data['M_and_A_share']:.1f}%", 'M_and_A_share')
+    ]))
+
+# Year-over-year change under a metric card value, from the snapshot's
+# precomputed labels (None for the first year)
+def metric_delta(snap, year, metric):
+    label = snap.delta_labels().get((year, metric))
+    if label is None:
+        return None
+    text, class_name = label
+    return html.Small(text, className=class_name)
+
+def metric_cards(snap, year, metrics):
+    return dbc.Row([metric_card(label, value, metric_delta(snap, year, metric)) for label, value, metric in metrics])
+
+def build_overview_countries_figure(snap, year):
+    countries, counts, _ = snap.top_countries(year)
     fig = px.bar(
-        x=['USA', 'China', 'India'],
-        y=[year_data['USA'], year_data['China'], year_data['India']],
+        x=countries,
+        y=counts,
         title="",
-        labels={'x': 'Country', 'y': 'Count'},
-        color=['USA', 'China', 'India'],
-        color_discrete_sequence=[COLORS['primary'], COLORS['accent'], '#FFA500']
+        labels={'x': 'Country', 'y': 'Count'}
     )
+    fig.update_traces(marker_color=[country_color(c) for c in countries])
     fig.update_layout(
         showlegend=False,
         margin=dict(l=20, r=20, t=20, b=20),
@@ -973,19 +2024,24 @@ def update_overview_countries(year):
     )
     return fig
 
-# Callback: Update Overview FDI
-@app.callback(
-    Output('overview_fdi', 'figure'),
-    Input('overview_year', 'value')
-)
-def update_overview_fdi(year):
-    year_data = df[df['year'] == year].iloc[0]
+# The top countries can change from year to year, so the countries chart is a
+# single trace whose bars, labels and colors are all replaced
+def patch_countries_figure(snap, year):
+    countries, counts, _ = snap.top_countries(year)
+    patched = Patch()
+    patched['data'][0]['x'] = countries
+    patched['data'][0]['y'] = counts
+    patched['data'][0]['marker']['color'] = [country_color(c) for c in countries]
+    return patched
+
+def build_overview_fdi_figure(snap, year):
+    year_data = snap.year_row(year)
     fig = px.bar(
-        x=['OFDI', 'IFDI'],
-        y=[year_data['OFDI'], year_data['IFDI']],
+        x=OVERVIEW_FDI,
+        y=[year_data[c] for c in OVERVIEW_FDI],
         title="",
         labels={'x': 'Type', 'y': 'Amount (Billion USD)'},
-        color=['OFDI', 'IFDI'],
+        color=OVERVIEW_FDI,
         color_discrete_sequence=[COLORS['primary'], COLORS['accent']]
     )
     fig.update_layout(
@@ -1000,25 +2056,68 @@ def update_overview_fdi(year):
     )
     return fig
 
-# Callback: Update Distribution Pie Charts
+# px.bar with a color per category (as in the FDI chart) draws one single-bar
+# trace per category, so a year change only needs to replace each trace's y
+def patch_bar_values(year_data, columns):
+    patched = Patch()
+    for i, col in enumerate(columns):
+        patched['data'][i]['y'] = [year_data[col]]
+    return patched
+
+# Callback: Update Overview (summary, metrics and both charts in one round trip).
+# The page already shows the latest year, so this only does work when the year
+# differs (a change, a ?year= link or a year restored from the session) and sends
+# the new bar values instead of whole figures.
 @app.callback(
-    Output('pie1', 'figure'),
-    Output('pie2', 'figure'),
-    Output('pie3', 'figure'),
-    Output('distribution_metrics', 'children'),
-    Input('dist_year', 'value')
+    Output('overview_text', 'children'),
+    Output('overview_metrics', 'children'),
+    Output('overview_countries', 'figure'),
+    Output('overview_fdi', 'figure'),
+    Input('overview_year', 'value')
 )
-def update_pies(year):
-    row = df[df.year == year].iloc[0]
-    
-    # eMNC Distribution
-    fig1 = px.pie(
-        names=['USA', 'China', 'India', 'Other'],
-        values=[row.USA, row.China, row.India, max(row.EMNC_total-row.USA-row.China-row.India,0)],
+def update_overview(year):
+    snap = current_snapshot()
+    if year not in snap.years or year == snap.latest_year and dash.ctx.triggered_id is None:
+        raise PreventUpdate
+    year_data = snap.year_row(year)
+    return (
+        overview_text_content(snap, year),
+        overview_metrics_content(snap, year, year_data),
+        patch_countries_figure(snap, year),
+        patch_bar_values(year_data, OVERVIEW_FDI)
+    )
+
+# Distribution tab building blocks, shared by the initial layout and the year callback
+def distribution_pie_slices(snap, year, row):
+    countries, counts, other = snap.top_countries(year)
+    return {
+        # eMNC Distribution
+        'pie1': (countries + ('Other',), counts + (other,)),
+        # FDI Distribution
+        'pie2': (('OFDI', 'IFDI'), (row.OFDI, row.IFDI)),
+        # Investment Type Distribution
+        'pie3': (('Greenfield', 'M&A'), (row.Greenfield, row.M_and_A))
+    }
+
+# Slice colors; names not listed here are countries
+PIE_COLORS = {
+    'OFDI': COLORS['primary'], 'IFDI': COLORS['accent'],
+    'Greenfield': COLORS['primary'], 'M&A': COLORS['accent']
+}
+
+def pie_colors(names):
+    return [PIE_COLORS.get(name) or country_color(name) for name in names]
+
+def build_distribution_pie(snap, year, pie_id):
+    names, values = distribution_pie_slices(snap, year, snap.year_row(year))[pie_id]
+    fig = px.pie(
+        names=names,
+        values=values,
         title="",
-        color_discrete_sequence=[COLORS['primary'], COLORS['accent'], '#FFA500', COLORS['secondary']]
+        color=names,
+        color_discrete_map=dict(zip(names, pie_colors(names)))
     )
-    fig1.update_layout(
+    fig.update_layout(
         showlegend=True,
         margin=dict(l=20, r=20, t=20, b=20),
         plot_bgcolor='white',
@@ -1031,19 +2130,149 @@ def update_pies(year):
             x=1
         )
     )
-    
-    # FDI Distribution
-    fig2 = px.pie(
-        names=['OFDI', 'IFDI'],
-        values=[row.OFDI, row.IFDI],
-        title="",
-        color_discrete_sequence=[COLORS['primary'], COLORS['accent']]
-    )
-    fig2.update_layout(
-        showlegend=True,
+    return fig
+
+def distribution_metrics_content(snap, year, row):
+    return snap.cached(('distribution_metrics', year), lambda: metric_cards(snap, year, [
+        ("eMNC Share of Fortune 500", f"{row.EMNC_share:.1f}%", 'EMNC_share'),
+        ("GDP Share", f"{row.GDP_share:.1f}%", 'GDP_share'),
+        ("ESG Score", f"{row.D_ESG}", 'D_ESG'),
+        ("Billionaires per 100 eMNCs", f"{row.Billionaires_per_100eMNC:.1f}", 'Billionaires_per_100eMNC')
+    ]))
+
+# Per-year figures, addressable like FIGURE_BUILDERS; builders take (snapshot, year)
+YEAR_FIGURE_BUILDERS = {
+    'overview_countries': build_overview_countries_figure,
+    'overview_fdi': build_overview_fdi_figure,
+    'pie1': partial(build_distribution_pie, pie_id='pie1'),
+    'pie2': partial(build_distribution_pie, pie_id='pie2'),
+    'pie3': partial(build_distribution_pie, pie_id='pie3')
+}
+
+# Callback: Update Distribution Pie Charts
+# The pies are built with the page; a year change (or a ?year= link or a year
+# restored from the session) only patches each pie's slices (layout and legend config
+# are already on the client).
+@app.callback(
+    Output('pie1', 'figure'),
+    Output('pie2', 'figure'),
+    Output('pie3', 'figure'),
+    Output('distribution_metrics', 'children'),
+    Input('dist_year', 'value')
+)
+def update_pies(year):
+    snap = current_snapshot()
+    if year not in snap.years or year == snap.latest_year and dash.ctx.triggered_id is None:
+        raise PreventUpdate
+    row = snap.year_row(year)
+    patches = []
+    for names, values in distribution_pie_slices(snap, year, row).values():
+        patched = Patch()
+        patched['data'][0]['labels'] = names
+        patched['data'][0]['values'] = values
+        patched['data'][0]['marker']['colors'] = pie_colors(names)
+        patches.append(patched)
+    return (*patches, distribution_metrics_content(snap, year, row))
+
+# --- Scenario simulator (Future tab) ---
+# Monte Carlo projection of every metric under user-set assumptions. Level
+# metrics follow geometric random walks and score/percentage metrics additive
+# ones, with drift and volatility estimated from the reported years; the
+# sliders override the drift of OFDI, the greenfield share and the ESG score.
+# Greenfield and M&A are simulated as a total plus a greenfield share, and the
+# derived metrics are computed from the simulated base metrics. All metrics
+# and paths are simulated in one batch of array operations, and results are
+# memoized per (snapshot, assumptions).
+SCENARIO_PATHS = 10_000
+SCENARIO_QUANTILES = [5, 25, 50, 75, 95]
+SCENARIO_SEED = 2025
+SCENARIO_ADDITIVE = ['GDP_share', 'GDP_growth', 'D_ESG', 'Greenfield_share']
+SCENARIO_MAX_HORIZON = 6
+SCENARIO_CACHE_SIZE = 256  # simulated slider settings kept per snapshot
+SCENARIO_DEFAULT_METRIC = 'EMNC_total'
+
+def scenario_defaults(snap):
+    def compute():
+        table = snap.metrics_table()
+        first, last = table.iloc[0], table.iloc[-1]
+        span = float(table.index[-1] - table.index[0])
+        return {
+            'ofdi_growth': round(float(snap.cagr()['OFDI']), 1),
+            'greenfield_trend': round(float(last['Greenfield_share'] - first['Greenfield_share']) / span, 1),
+            'esg_rate': round(float(last['D_ESG'] - first['D_ESG']) / span, 1)
+        }
+    return snap.cached('scenario_defaults', compute)
+
+def run_scenario(snap, ofdi_growth, greenfield_trend, esg_rate, horizon):
+    def compute():
+        table = snap.metrics_table()
+        # Only base columns are simulated; derived metrics are recomputed from the paths
+        base = [c for c in snap.df.columns if c != 'year' and c not in DERIVED_METRICS]
+        history = table[base].assign(
+            Investment=table['Greenfield'] + table['M_and_A'],
+            Greenfield_share=table['Greenfield_share']
+        ).drop(columns=['Greenfield', 'M_and_A'])
+        additive = [c for c in history.columns if c in SCENARIO_ADDITIVE]
+        geometric = [c for c in history.columns if c not in SCENARIO_ADDITIVE]
+        rng = np.random.default_rng(SCENARIO_SEED)
+        shape = (SCENARIO_PATHS, horizon)
+
+        # Geometric walks on log levels
+        log_steps = np.log(history[geometric]).diff().iloc[1:]
+        drift = log_steps.mean().to_numpy()
+        drift[geometric.index('OFDI')] = np.log1p(ofdi_growth / 100)
+        shocks = rng.standard_normal((len(geometric),) + shape) * log_steps.std().to_numpy()[:, None, None]
+        levels = history[geometric].iloc[-1].to_numpy()[:, None, None] * np.exp(
+            np.cumsum(drift[:, None, None] + shocks, axis=2)
+        )
+
+        # Additive walks on scores and percentages
+        steps = history[additive].diff().iloc[1:]
+        drift = steps.mean().to_numpy()
+        drift[additive.index('Greenfield_share')] = greenfield_trend
+        drift[additive.index('D_ESG')] = esg_rate
+        shocks = rng.standard_normal((len(additive),) + shape) * steps.std().to_numpy()[:, None, None]
+        scores = history[additive].iloc[-1].to_numpy()[:, None, None] + np.cumsum(drift[:, None, None] + shocks, axis=2)
+
+        paths = dict(zip(geometric, levels))
+        paths.update(zip(additive, scores))
+        share = np.clip(paths.pop('Greenfield_share'), 0, 100) / 100
+        investment = paths.pop('Investment')
+        paths['Greenfield'] = investment * share
+        paths['M_and_A'] = investment - paths['Greenfield']
+        for name, func in DERIVED_METRICS.items():
+            paths[name] = func(paths)
+
+        # Nearest-rank quantiles from one sort over the path axis (much cheaper
+        # than np.percentile's per-quantile interpolation)
+        metrics = snap.metric_columns
+        ranks = np.rint(np.array(SCENARIO_QUANTILES) / 100 * (SCENARIO_PATHS - 1)).astype(int)
+        bands = np.sort(np.stack([paths[m] for m in metrics]), axis=1)[:, ranks]
+        years = list(range(snap.latest_year + 1, snap.latest_year + horizon + 1))
+        return years, dict(zip(metrics, bands))
+    return snap.cached_bounded('scenario', (ofdi_growth, greenfield_trend, esg_rate, horizon), compute,
+                               SCENARIO_CACHE_SIZE)
+
+def build_fan_chart(snap, metric, years, bands):
+    reported = snap.metrics_table()[metric]
+    # Start the fan at the last reported value so it joins the history line
+    x = [snap.latest_year] + years
+    band = lambda q: [reported.iloc[-1], *bands[SCENARIO_QUANTILES.index(q)]]
+    fig = go.Figure([
+        go.Scatter(x=x, y=band(95), line=dict(width=0), hoverinfo='skip', showlegend=False),
+        go.Scatter(x=x, y=band(5), fill='tonexty', fillcolor='rgba(179, 27, 27, 0.15)',
+                   line=dict(width=0), name="90% range"),
+        go.Scatter(x=x, y=band(75), line=dict(width=0), hoverinfo='skip', showlegend=False),
+        go.Scatter(x=x, y=band(25), fill='tonexty', fillcolor='rgba(179, 27, 27, 0.3)',
+                   line=dict(width=0), name="50% range"),
+        go.Scatter(x=x, y=band(50), line=dict(color=COLORS['primary'], dash='dash'), name="Median"),
+        go.Scatter(x=list(reported.index), y=reported.to_numpy(), line=dict(color=COLORS['accent']), name="Reported")
+    ])
+    fig.update_layout(
         margin=dict(l=20, r=20, t=20, b=20),
         plot_bgcolor='white',
         paper_bgcolor='white',
+        height=350,
         legend=dict(
             orientation="h",
             yanchor="bottom",
@@ -1052,110 +2281,316 @@ def update_pies(year):
             x=1
         )
     )
-    
-    # Investment Type Distribution
-    fig3 = px.pie(
-        names=['Greenfield', 'M&A'],
-        values=[row.Greenfield, row.M_and_A],
-        title="",
-        color_discrete_sequence=[COLORS['primary'], COLORS['accent']]
-    )
-    fig3.update_layout(
-        showlegend=True,
-        margin=dict(l=20, r=20, t=20, b=20),
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1
+    return fig
+
+def scenario_slider(slider_id, label, value, min_value, max_value, step):
+    return html.Div([
+        html.Label(label, className="mb-1"),
+        dcc.Slider(
+            id=slider_id,
+            min=min_value,
+            max=max_value,
+            step=step,
+            value=value,
+            persistence=True,
+            persistence_type='session',
+            marks=None,
+            tooltip={'placement': 'bottom', 'always_visible': True},
+            updatemode='drag'
         )
+    ], className="mb-3")
+
+def scenario_panel(snap):
+    defaults = scenario_defaults(snap)
+    return panel(
+        "Scenario Simulator",
+        html.P(f"{SCENARIO_PATHS:,} simulated paths per metric; adjust the assumptions to update the fan chart",
+               className="text-muted"),
+        dbc.Row([
+            dbc.Col([
+                html.Label("Metric:", className="mb-1"),
+                dcc.Dropdown(
+                    id='scenario_metric',
+                    options=[{'label': m, 'value': m} for m in snap.metric_columns],
+                    value=SCENARIO_DEFAULT_METRIC,
+                    clearable=False,
+                    persistence=True,
+                    persistence_type='session',
+                    className="mb-3"
+                ),
+                scenario_slider('scenario_ofdi_growth', "OFDI growth (% per year)", defaults['ofdi_growth'], -10, 20, 0.5),
+                scenario_slider('scenario_greenfield_trend', "Greenfield share trend (pts per year)", defaults['greenfield_trend'], -5, 5, 0.1),
+                scenario_slider('scenario_esg_rate', "ESG improvement (pts per year)", defaults['esg_rate'], -5, 5, 0.1),
+                scenario_slider('scenario_horizon', "Horizon (years)", 2, 1, SCENARIO_MAX_HORIZON, 1)
+            ], width=12, lg=4),
+            dbc.Col([
+                html.Div(
+                    dcc.Graph(id='scenario_fan', config={'displayModeBar': False}),
+                    className="graph-container"
+                ),
+                html.Div(id='scenario_summary', className="text-muted small")
+            ], width=12, lg=8)
+        ])
     )
-    
-    # Key Metrics
-    metrics = [
-        ("eMNC Share of Fortune 500", f"{row.EMNC_share:.1f}%"),
-        ("GDP Share", f"{row.GDP_share:.1f}%"),
-        ("ESG Score", f"{row.D_ESG}"),
-        ("Billionaires per 100 eMNCs", f"{row.Billionaires_per_100eMNC:.1f}")
-    ]
-    
-    metrics_content = dbc.Row([
-        dbc.Col([
-            dbc.Card(
-                dbc.CardBody([
-                    html.H5(label, className="card-title"),
-                    html.P(value, className="card-text h4", style={'color': COLORS['primary']})
-                ]),
-                class_name="mb-3"
-            )
-        ], width=6) for label, value in metrics
-    ])
-    
-    return fig1, fig2, fig3, metrics_content
 
-# Callback: Update Correlation Analysis
+# Callback: Update Scenario Fan Chart
 @app.callback(
-    Output('correlation_heatmap', 'figure'),
-    Output('strong_correlations', 'children'),
-    Output('correlation_insights', 'children'),
-    Input('tabs', 'active_tab')
+    Output('scenario_fan', 'figure'),
+    Output('scenario_summary', 'children'),
+    Input('scenario_metric', 'value'),
+    Input('scenario_ofdi_growth', 'value'),
+    Input('scenario_greenfield_trend', 'value'),
+    Input('scenario_esg_rate', 'value'),
+    Input('scenario_horizon', 'value')
 )
-def update_correlations(active_tab):
-    if active_tab != "correlations":
-        return {}, "", ""
-
-    # Select relevant columns for correlation
-    cols = [
-        'EMNC_total', 'USA', 'China', 'India',
-        'OFDI', 'IFDI', 'GDP_share', 'GDP_growth',
-        'D_ESG', 'Billionaire_count', 'EMNC_share',
-        'FDI_net', 'FDI_ratio', 'Greenfield_share',
-        'M_and_A_share', 'D_ESG_per_100eMNC',
-        'Billionaires_per_100eMNC'
-    ]
+def update_scenario(metric, ofdi_growth, greenfield_trend, esg_rate, horizon):
+    snap = current_snapshot()
+    # Round to the slider steps so equivalent assumptions share a cache entry
+    years, bands = run_scenario(snap, round(ofdi_growth, 1), round(greenfield_trend, 1), round(esg_rate, 1), int(horizon))
+    # A metric from another snapshot (or a stale session) falls back to the default
+    metric = metric if metric in bands else SCENARIO_DEFAULT_METRIC
+    low, median, high = (bands[metric][SCENARIO_QUANTILES.index(q), -1] for q in (5, 50, 95))
+    summary = f"{years[-1]} median: {median:,.1f} (90% range {low:,.1f} – {high:,.1f})"
+    return build_fan_chart(snap, metric, years, bands[metric]), summary
 
-    # Calculate correlation matrix
-    corr = df[cols].corr()
+# --- High-volume series (Trends tab) ---
+# Series with 10^5-10^6 points are never sent whole: each trace is reduced on
+# the server to about SERIES_POINTS_PER_PIXEL points per pixel of the browser
+# window (LTTB by default, or min/max per bucket) and drawn with WebGL. Zooming
+# requests the visible window again at the same resolution, so the detail
+# grows as the window shrinks while the payload stays bounded.
+SERIES_DOWNSAMPLER = os.environ.get("SERIES_DOWNSAMPLER", "lttb")
+SERIES_POINTS_PER_PIXEL = float(os.environ.get("SERIES_POINTS_PER_PIXEL", 1))
+SERIES_MAX_POINTS = int(os.environ.get("SERIES_MAX_POINTS", 4000))
+SERIES_DEFAULT_SELECTION = 3
+SERIES_CACHE_SIZE = 512  # downsampled windows kept per snapshot
 
-    # Create heatmap
-    fig = px.imshow(
-        corr,
-        text_auto=True,
-        color_continuous_scale='RdBu',
-        aspect="auto",
-        labels=dict(x="Metric", y="Metric", color="Correlation")
-    )
+# Largest-Triangle-Three-Buckets: keeps the first and last points and, from
+# each bucket in between, the point forming the largest triangle with the
+# previously kept point and the average of the next bucket
+def lttb_downsample(x, y, n_out):
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return x, y
+    xf = x.astype('float64')
+    edges = np.linspace(1, n - 1, n_out - 1).astype('int64')
+    keep = np.empty(n_out, dtype='int64')
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = xf[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((xf[a] - avg_x) * (y[start:end] - y[a]) - (xf[a] - xf[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        keep[i + 1] = a
+    return x[keep], y[keep]
+
+# Min/max per bucket: cheaper than LTTB and never hides a spike
+def minmax_downsample(x, y, n_out):
+    n = len(x)
+    if n <= n_out or n_out < 4:
+        return x, y
+    # The first and last points, plus two per bucket of the points between
+    # them; the last bucket also takes the remainder, so none is skipped
+    buckets = (n_out - 2) // 2
+    size = (n - 2) // buckets
+    split = 1 + (buckets - 1) * size
+    blocks = y[1:split].reshape(buckets - 1, size)
+    starts = 1 + np.arange(buckets - 1) * size
+    tail = y[split:n - 1]
+    keep = np.concatenate([
+        [0], starts + blocks.argmin(axis=1), starts + blocks.argmax(axis=1),
+        [split + tail.argmin(), split + tail.argmax(), n - 1]
+    ])
+    keep = np.unique(keep)
+    return x[keep], y[keep]
+
+SERIES_DOWNSAMPLERS = {'lttb': lttb_downsample, 'minmax': minmax_downsample}
+
+def series_points(width):
+    return int(min(max((width or 1000) * SERIES_POINTS_PER_PIXEL, 100), SERIES_MAX_POINTS))
+
+# Downsampled (x, y) of one series between two nanosecond timestamps (None =
+# open ended); x is returned as epoch milliseconds for a date axis. The
+# neighbours just outside the window are kept so lines reach the plot edges.
+def series_window(snap, name, start, end, n_out):
+    def compute():
+        x, y = snap.series[name]
+        lo = 0 if start is None else max(int(np.searchsorted(x, start, side='left')) - 1, 0)
+        hi = len(x) if end is None else min(int(np.searchsorted(x, end, side='right')) + 1, len(x))
+        x, y = SERIES_DOWNSAMPLERS[SERIES_DOWNSAMPLER](x[lo:hi], y[lo:hi], n_out)
+        return x // 1_000_000, y
+    return snap.cached_bounded('series_window', (name, start, end, n_out), compute, SERIES_CACHE_SIZE)
+
+def build_series_figure(snap, names, n_out):
+    fig = go.Figure([
+        go.Scattergl(x=x, y=y, mode='lines', name=name)
+        for name in names
+        for x, y in [series_window(snap, name, None, None, n_out)]
+    ])
     fig.update_layout(
+        xaxis=dict(type='date'),
+        hovermode='x unified',
+        uirevision='series',  # keep the zoom when traces are patched
         margin=dict(l=20, r=20, t=20, b=20),
         plot_bgcolor='white',
-        paper_bgcolor='white'
+        paper_bgcolor='white',
+        height=450
     )
+    return fig
+
+# Visible x range from a relayout event: (start, end) in nanoseconds, (None,
+# None) on autorange, or None if the x axis did not change
+def relayout_window(relayout):
+    relayout = relayout or {}
+    if relayout.get('xaxis.autorange'):
+        return None, None
+    bounds = relayout.get('xaxis.range') or [relayout.get('xaxis.range[0]'), relayout.get('xaxis.range[1]')]
+    if bounds[0] is None or bounds[1] is None:
+        return None
+    return tuple(pd.Timestamp(b).value for b in bounds)
 
-    # Static narrative and top-5 summary
-    intro = (
-        "Across 2016–2024, several exceptionally strong relationships stand out "
-        "among our strategic metrics. Here are the top five correlations:"
+def series_panel(snap):
+    names = list(snap.series)
+    return panel(
+        "High-Volume Series",
+        html.P(f"{len(names)} series, {sum(len(x) for x, _ in snap.series.values()):,} points; "
+               "zoom in to load more detail", className="text-muted"),
+        dcc.Dropdown(
+            id='series_select',
+            options=names,
+            value=names[:SERIES_DEFAULT_SELECTION],
+            multi=True,
+            persistence=True,
+            persistence_type='session',
+            className="mb-3"
+        ),
+        dcc.Store(id='series_width'),
+        html.Div(dcc.Graph(id='series_graph', config={'displayModeBar': False}), className="graph-container")
     )
-    top5 = [
-        "Greenfield vs. M&A share: Perfect inverse (r = –1.00) – as firms shift toward new greenfield projects, they correspondingly pursue fewer acquisitions.",
-        "EMNC count vs. EMNC share: Perfect positive (r = +1.00) – since share is derived from count, this validates our ratio calculation.",
-        "Inward FDI vs. Billionaire count: Very strong positive (r ≈ +0.999) – higher foreign inflows coincide with rising domestic wealth concentration.",
-        "India's Fortune 500 count vs. OFDI: Very strong positive (r ≈ +0.997) – India's outbound investments mirror its growing Fortune 500 presence.",
-        "Inward FDI vs. ESG score: Very strong positive (r ≈ +0.995) – global investors favor EMNCs with robust ESG performance."
-    ]
 
-    # 1️⃣ Strongest correlations with inline styles
-    strong_items = []
-    for text in top5:
-        title, desc = text.split("–", 1)
-        strong_items.append(
+# Browser width, which sets how many points each trace gets
+app.clientside_callback(
+    "function(_) { return window.innerWidth; }",
+    Output('series_width', 'data'),
+    Input('series_select', 'id')
+)
+
+# Callback: High-volume series. Changing the selection sends a new figure;
+# zooming only patches each trace's points for the visible window.
+@app.callback(
+    Output('series_graph', 'figure'),
+    Input('series_select', 'value'),
+    Input('series_graph', 'relayoutData'),
+    Input('series_width', 'data'),
+    prevent_initial_call=True
+)
+def update_series(names, relayout, width):
+    snap = current_snapshot()
+    names = [name for name in names or [] if name in snap.series]
+    n_out = series_points(width)
+    if dash.ctx.triggered_id != 'series_graph':
+        return build_series_figure(snap, names, n_out)
+    window = relayout_window(relayout)
+    if window is None:
+        return dash.no_update
+    patched = Patch()
+    for i, name in enumerate(names):
+        x, y = series_window(snap, name, *window, n_out)
+        patched['data'][i]['x'] = x
+        patched['data'][i]['y'] = y
+    return patched
+
+# --- Edition comparison (Trends tab) ---
+# One metric across report editions: its level in each edition and its
+# revision against a base edition, sliced from the snapshot's edition cube.
+# Figures are memoized per (metric, base, editions) on the snapshot, keeping
+# the EDITION_CACHE_SIZE most recent selections.
+EDITION_DEFAULT_COMPARE = 5
+EDITION_CACHE_SIZE = 256
+
+def build_edition_figures(snap, metric, base, editions):
+    def build():
+        names, years, metrics, cube = snap.edition_cube()
+        m = metrics.index(metric)
+        shown = [base] + [e for e in editions if e != base]
+        idx = [names.index(e) for e in shown]
+        colors = dict(zip(names, px.colors.qualitative.Plotly * (len(names) // 10 + 1)))
+        levels = go.Figure([
+            go.Scatter(x=years, y=cube[i, :, m], mode='lines+markers', name=name, line=dict(color=colors[name]))
+            for i, name in zip(idx, shown)
+        ])
+        revisions = go.Figure([
+            go.Bar(x=years, y=snap.edition_revisions(base)[i, :, m], name=name, marker_color=colors[name])
+            for i, name in zip(idx[1:], shown[1:])
+        ])
+        for fig, title in ((levels, metric), (revisions, f"Revision vs {base}")):
+            fig.update_layout(
+                yaxis_title=title,
+                hovermode='x unified',
+                margin=dict(l=20, r=20, t=20, b=20),
+                plot_bgcolor='white',
+                paper_bgcolor='white',
+                height=350
+            )
+        return levels.to_plotly_json(), revisions.to_plotly_json()
+    return snap.cached_bounded('edition_figures', (metric, base, editions), build, EDITION_CACHE_SIZE)
+
+def edition_panel(snap):
+    names, _, metrics, _ = snap.edition_cube()
+    return panel(
+        "Edition Comparison",
+        html.P(f"{len(names)} report editions loaded", className="text-muted"),
+        dbc.Row([
+            dbc.Col([
+                html.Label("Metric:", className="mb-1"),
+                dcc.Dropdown(id='edition_metric', options=metrics, value=metrics[0], clearable=False,
+                             persistence=True, persistence_type='session')
+            ], width=12, lg=4),
+            dbc.Col([
+                html.Label("Base edition:", className="mb-1"),
+                dcc.Dropdown(id='edition_base', options=names, value=CURRENT_EDITION, clearable=False,
+                             persistence=True, persistence_type='session')
+            ], width=12, lg=3),
+            dbc.Col([
+                html.Label("Compare with:", className="mb-1"),
+                dcc.Dropdown(id='edition_compare', options=names, value=names[1:EDITION_DEFAULT_COMPARE + 1], multi=True,
+                             persistence=True, persistence_type='session')
+            ], width=12, lg=5)
+        ], className="mb-3"),
+        dbc.Row([
+            dbc.Col([dcc.Graph(id='edition_levels', config={'displayModeBar': False})], width=12, lg=6),
+            dbc.Col([dcc.Graph(id='edition_revisions', config={'displayModeBar': False})], width=12, lg=6)
+        ])
+    )
+
+# Callback: Edition Comparison
+@app.callback(
+    Output('edition_levels', 'figure'),
+    Output('edition_revisions', 'figure'),
+    Input('edition_metric', 'value'),
+    Input('edition_base', 'value'),
+    Input('edition_compare', 'value')
+)
+def update_editions(metric, base, editions):
+    snap = current_snapshot()
+    names, _, metrics, _ = snap.edition_cube()
+    # Values from another snapshot (or a stale session) fall back to the defaults
+    metric = metric if metric in metrics else metrics[0]
+    base = base if base in names else CURRENT_EDITION
+    editions = tuple(e for e in names if e in (editions or []))
+    return build_edition_figures(snap, metric, base, editions)
+
+# Strongest correlations and key insights, rendered once per snapshot
+def correlation_insight_content(snap):
+    def build():
+        derived = derive_insights(snap)
+        strong_items = [
             html.Li(
                 [
-                    html.Strong(title.strip()),
-                    html.Span(" – " + desc.strip(), className="text-muted")
+                    html.Strong(title),
+                    html.Span(" – " + desc, className="text-muted")
                 ],
                 style={
                     'borderLeft': f"4px solid {COLORS['accent']}",
@@ -1165,32 +2600,17 @@ def update_correlations(active_tab):
                     'marginBottom': '0.5rem'
                 }
             )
-        )
-
-    strong_correlations_content = html.Div([
-        html.P(intro, style={
-            'marginBottom': '1rem',
-            'fontStyle': 'italic',
-            'color': '#555'
-        }),
-        html.Ul(strong_items, style={'listStyleType': 'none', 'padding': 0})
-    ])
-
-    # Key insights
-    insights = [
-        "Emerging-market multinationals are both drivers and beneficiaries of FDI flows, underscoring their strategic economic role.",
-        "Investment type mix matters: the perfect trade-off between greenfield spending and M&A highlights distinct market-entry strategies.",
-        "Wealth indicators (billionaire counts) track closely with FDI, reflecting the interplay between capital mobility and domestic wealth creation.",
-        "ESG leadership attracts capital: the high correlation with IFDI suggests sustainability performance is increasingly table stakes for global investors.",
-        "Foreign direct investment is a cornerstone of wealth creation in emerging markets, evidenced by its near-perfect link to billionaire growth.",
-        "ESG excellence has become a critical capital magnet; top sustainability performers draw far more international funding.",
-        "The close ESG-wealth connection suggests that sustainable business practices and domestic wealth generation are mutually reinforcing."
-    ]
-
-    # 2️⃣ Key insights with inline styles
-    insights_items = []
-    for insight in insights:
-        insights_items.append(
+            for title, desc in derived['strongest']
+        ]
+        strong_correlations_content = html.Div([
+            html.P(derived['intro'], style={
+                'marginBottom': '1rem',
+                'fontStyle': 'italic',
+                'color': '#555'
+            }),
+            html.Ul(strong_items, style={'listStyleType': 'none', 'padding': 0})
+        ])
+        insights_items = [
             html.Li(
                 html.Strong(insight),
                 style={
@@ -1201,14 +2621,752 @@ def update_correlations(active_tab):
                     'marginBottom': '0.5rem'
                 }
             )
-        )
+            for insight in derived['insights']
+        ]
+        insights_content = html.Div([
+            html.Ul(insights_items, style={'listStyleType': 'none', 'padding': 0})
+        ])
+        return strong_correlations_content, insights_content
+    return snap.cached('correlation_insight_content', build)
 
-    insights_content = html.Div([
+# Callback: Update Correlation Analysis
+@app.callback(
+    Output('correlation_heatmap', 'figure'),
+    Output('strong_correlations', 'children'),
+    Output('correlation_insights', 'children'),
+    Input('correlation_heatmap', 'id')  # runs when the page is opened
+)
+def update_correlations(_):
+    snap = current_snapshot()
+    return (get_figure(snap, 'correlation_heatmap'), *correlation_insight_content(snap))
+
+# --- Figure export (PNG/SVG/PDF) ---
+# Images are rendered by kaleido (bundled headless Chromium) in a bounded pool of
+# worker processes and cached on disk, keyed by a hash of the figure JSON, so
+# repeat requests are served straight from the cache. The cache is trimmed to
+# EXPORT_CACHE_MAX_MB, least recently used files first. Small PNG thumbnails of
+# the same figures are served from /thumbnail/<figure>.png.
+EXPORT_FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'pdf': 'application/pdf'
+}
+EXPORT_CACHE_DIR = os.environ.get("EXPORT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "cornell_exports"))
+EXPORT_WORKERS = int(os.environ.get("EXPORT_WORKERS", 2))
+EXPORT_TIMEOUT = 60  # seconds
+EXPORT_WIDTH, EXPORT_HEIGHT = 1200, 600
+THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT = 480, 240
+EXPORT_CACHE_MAX_BYTES = int(float(os.environ.get("EXPORT_CACHE_MAX_MB", 256)) * 1024 * 1024)
+# Checked without importing: only the export workers load kaleido
+KALEIDO_AVAILABLE = importlib.util.find_spec("kaleido") is not None
 
-        html.Ul(insights_items, style={'listStyleType': 'none', 'padding': 0})
+_export_pool = None
+_export_lock = threading.Lock()
+_export_inflight = {}  # cache key -> (pool, Future), so concurrent requests share one render
+
+def _render_figure_image(fig_json, fmt, width, height, scale):
+    # Runs inside an export worker process
+    return pio.to_image(pio.from_json(fig_json), format=fmt, width=width, height=height, scale=scale)
+
+def _submit_export(key, fig_json, fmt, width, height, scale):
+    global _export_pool
+    with _export_lock:
+        inflight = _export_inflight.get(key)
+        if inflight is None:
+            if _export_pool is None:
+                # spawn rather than fork: the server process is multi-threaded
+                _export_pool = ProcessPoolExecutor(
+                    max_workers=EXPORT_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            try:
+                future = _export_pool.submit(_render_figure_image, fig_json, fmt, width, height, scale)
+            except BrokenProcessPool:
+                # A worker died since the last render; the caller retries on a new pool
+                future = Future()
+                future.set_exception(BrokenProcessPool("export pool is broken"))
+            inflight = _export_inflight[key] = (_export_pool, future)
+            future.add_done_callback(lambda _: _export_inflight.pop(key, None))
+        return inflight
+
+def _discard_export_pool(pool):
+    global _export_pool
+    with _export_lock:
+        if _export_pool is pool:
+            _export_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+# Render through the pool; a pool broken by a dead worker is replaced and the
+# render tried once more
+def render_export(key, fig_json, fmt, width, height, scale):
+    for attempt in range(2):
+        pool, future = _submit_export(key, fig_json, fmt, width, height, scale)
+        try:
+            return future.result(timeout=EXPORT_TIMEOUT)
+        except BrokenProcessPool:
+            _discard_export_pool(pool)
+            if attempt:
+                raise
+
+# Drop the least recently used images once the cache is over its size limit,
+# never the one about to be served. Other threads and workers sharing the
+# directory prune it too, so any file may vanish while this runs.
+def prune_export_cache(keep):
+    entries = []
+    for entry in os.scandir(EXPORT_CACHE_DIR):
+        if entry.is_file() and entry.path != keep and not entry.name.endswith('.tmp'):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    try:
+        total = os.path.getsize(keep)
+    except FileNotFoundError:
+        total = 0
+    total += sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= EXPORT_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+def export_figure(fig_id, fmt, scale=1.0, width=EXPORT_WIDTH, height=EXPORT_HEIGHT):
+    fig_json = pio.to_json(get_figure(current_snapshot(), fig_id), validate=False)
+    key = hashlib.sha256(f"{fmt}|{width}x{height}|{scale}|{fig_json}".encode()).hexdigest()
+    path = os.path.join(EXPORT_CACHE_DIR, f"{key}.{fmt}")
+    try:
+        # Mark as recently used so pruning keeps it
+        os.utime(path)
+    except FileNotFoundError:
+        image = render_export(key, fig_json, fmt, width, height, scale)
+        os.makedirs(EXPORT_CACHE_DIR, exist_ok=True)
+        # Write to a temp file first so readers never see a partial image
+        fd, tmp_path = tempfile.mkstemp(dir=EXPORT_CACHE_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(image)
+        os.replace(tmp_path, path)
+        try:
+            prune_export_cache(path)
+        except OSError:
+            # The image is rendered and saved; a failed trim is retried by the next render
+            app.logger.exception("Pruning the export cache failed")
+    return path
+
+def send_export(fig_id, fmt, **options):
+    if not KALEIDO_AVAILABLE:
+        abort(503)
+    try:
+        path = export_figure(fig_id, fmt, **options)
+    except BrokenProcessPool:
+        # Export workers died twice in a row
+        abort(503)
+    except FutureTimeoutError:
+        abort(504)
+    return send_file(
+        path,
+        mimetype=EXPORT_FORMATS[fmt],
+        as_attachment='download' in request.args,
+        download_name=f"{fig_id}.{fmt}",
+        max_age=3600
+    )
+
+@app.server.route("/export/<fig_id>.<fmt>")
+def export_figure_route(fig_id, fmt):
+    if fig_id not in FIGURE_BUILDERS or fmt not in EXPORT_FORMATS:
+        abort(404)
+    scale = request.args.get('scale', 1.0, type=float)
+    if not math.isfinite(scale):
+        abort(400)
+    return send_export(fig_id, fmt, scale=min(max(scale, 0.5), 4.0))
+
+@app.server.route("/thumbnail/<fig_id>.png")
+def thumbnail_route(fig_id):
+    if fig_id not in FIGURE_BUILDERS:
+        abort(404)
+    return send_export(fig_id, 'png', width=THUMBNAIL_WIDTH, height=THUMBNAIL_HEIGHT)
+
+# --- Background data refresh ---
+# A daemon thread reloads the data when a source file changes (polled every
+# DATA_WATCH_INTERVAL seconds) and/or every DATA_REFRESH_INTERVAL seconds. The
+# new snapshot is built and warmed off the request path, then published.
+DATA_REFRESH_INTERVAL = float(os.environ.get("DATA_REFRESH_INTERVAL", 0))  # 0 = only on file changes
+DATA_WATCH_INTERVAL = float(os.environ.get("DATA_WATCH_INTERVAL", 5))
+
+_refresh_thread = None
+_refresh_lock = threading.Lock()
+
+# Every cacheable figure of a snapshot, as (figure id, year) pairs
+def warmup_jobs(snap):
+    return [(fig_id, None) for fig_id in FIGURE_BUILDERS] + [
+        (fig_id, year) for fig_id in YEAR_FIGURE_BUILDERS for year in snap.years
+    ]
+
+def _warmup_worker(snap, jobs, conn):
+    conn.send([(job, get_figure(snap, *job)) for job in jobs])
+    conn.close()
+
+# Start forked processes that build a snapshot's figures, or return None when
+# there is one worker. Workers are plain forked processes rather than a pool:
+# their target is inherited, not pickled, so this also works while the module
+# is still being imported.
+def fork_figure_workers(snap, workers):
+    if workers <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        return None
+    jobs = warmup_jobs(snap)
+    ctx = multiprocessing.get_context('fork')
+    running = []
+    for chunk in (jobs[i::workers] for i in range(min(workers, len(jobs)))):
+        receiver, sender = ctx.Pipe(duplex=False)
+        process = ctx.Process(target=_warmup_worker, args=(snap, chunk, sender), daemon=True)
+        process.start()
+        sender.close()
+        running.append((process, receiver))
+    return running
+
+# Build every cacheable artifact of a snapshot: figures (collected from the
+# processes started by fork_figure_workers, if any), then country breakdowns,
+# tab layouts, the correlation insights and the default scenario, which reuse
+# those figures.
+def warm_snapshot(snap, workers=1, running=None):
+    if running is None:
+        running = fork_figure_workers(snap, workers)
+    for process, receiver in running or []:
+        try:
+            results = receiver.recv()
+        except EOFError:
+            results = []
+        receiver.close()
+        process.join()
+        if not results:
+            app.logger.warning("Warm-up worker %s exited with code %s; building its figures serially",
+                               process.pid, process.exitcode)
+        for (fig_id, year), fig in results:
+            snap.cached(('figure', fig_id, year), lambda: fig)
+    # Whatever the workers did not deliver (everything when there were none)
+    for fig_id, year in warmup_jobs(snap):
+        get_figure(snap, fig_id, year)
+    for year in snap.years:
+        snap.top_countries(year)
+    for tab in TAB_IDS:
+        snap.cached(('tab', tab, None), lambda: build_tab_content(snap, tab))
+    correlation_insight_content(snap)
+    defaults = scenario_defaults(snap)
+    run_scenario(snap, defaults['ofdi_growth'], defaults['greenfield_trend'], defaults['esg_rate'], 2)
+
+def refresh_snapshot():
+    snap = load_snapshot()
+    if snap.version == current_snapshot().version:
+        return False
+    warm_snapshot(snap)
+    previous = current_snapshot()
+    publish_snapshot(snap)
+    app.logger.info("Published dataset version %s (%d values changed since %s)",
+                    snap.version, len(diff_snapshots(previous, snap)), previous.version)
+    return True
+
+def _refresh_loop():
+    # The baseline is the files as the published snapshot read them, so edits
+    # made before this thread started (it waits for the first request) count
+    signature, last_refresh = current_snapshot().source_signature, time.monotonic()
+    while True:
+        # Nothing in here may end the thread, or the data would never refresh again
+        try:
+            new_signature = _source_signature()
+            changed = new_signature != signature
+            due = DATA_REFRESH_INTERVAL and time.monotonic() - last_refresh >= DATA_REFRESH_INTERVAL
+            signature = new_signature
+            if changed or due:
+                try:
+                    refresh_snapshot()
+                finally:
+                    last_refresh = time.monotonic()
+        except Exception:
+            # Keep serving the current snapshot; the next trigger retries
+            app.logger.exception("Data refresh failed")
+        time.sleep(DATA_WATCH_INTERVAL)
+
+def start_refresh_scheduler():
+    global _refresh_thread
+    if not (DATA_PATH or COUNTRY_DATA_PATH or SERIES_PATH or EDITIONS_DIR or DATA_REFRESH_INTERVAL):
+        return
+    with _refresh_lock:
+        if _refresh_thread is None:
+            _refresh_thread = threading.Thread(target=_refresh_loop, name="data-refresh", daemon=True)
+            _refresh_thread.start()
+
+# Started on the first request rather than at import, so the thread runs in
+# the serving process even when a pre-forking server imports the app first
+@app.server.before_request
+def _ensure_refresh_scheduler():
+    if _refresh_thread is None:
+        start_refresh_scheduler()
+
+# --- Dataset version audit ---
+@app.server.route("/api/versions")
+def list_versions():
+    return jsonify([
+        {'version': snap.version, 'loaded_at': snap.loaded_at.isoformat(), 'current': snap is current_snapshot()}
+        for snap in snapshot_history()
     ])
 
-    return fig, strong_correlations_content, insights_content
+# Values that changed between two loaded versions (default: previous -> current)
+@app.server.route("/api/versions/diff")
+def version_diff():
+    history = snapshot_history()
+    old = find_snapshot(request.args['from']) if 'from' in request.args else history[max(len(history) - 2, 0)]
+    new = find_snapshot(request.args['to']) if 'to' in request.args else current_snapshot()
+    if old is None or new is None:
+        abort(404)
+    diff = diff_snapshots(old, new)
+    return jsonify({
+        'from': old.version,
+        'to': new.version,
+        'changes': json.loads(diff.to_json(orient='records'))
+    })
+
+# --- Metrics API ---
+# Read-only JSON over the same snapshot tables the dashboard uses:
+#   /api/metrics?start=2018&end=2022&metrics=OFDI,EMNC_total
+#   /api/correlations?metrics=OFDI,IFDI,China
+# Bodies are serialized once per (snapshot, query), keeping the
+# API_CACHE_SIZE most recent queries; the ETag is derived from the dataset
+# version and the query alone, so a revalidation costs nothing.
+API_CACHE_SIZE = 256
+
+def dumps_json(payload):
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, separators=(',', ':')).encode()
+
+def json_records(frame):
+    # NaN is not valid JSON; missing values are sent as null
+    return frame.astype(object).where(frame.notna(), None).to_dict('list')
+
+def api_metric_names(snap, default):
+    if 'metrics' not in request.args:
+        return tuple(default)
+    names = tuple(dict.fromkeys(m.strip() for m in request.args['metrics'].split(',') if m.strip()))
+    known = set(snap.metric_columns) | set(snap.country_table().columns)
+    if not names or not known.issuperset(names):
+        abort(400)
+    return names
+
+# A year bound from the query string; malformed values are rejected rather
+# than silently widened to the default
+def api_year_arg(name, default):
+    if name not in request.args:
+        return default
+    try:
+        return int(request.args[name])
+    except ValueError:
+        abort(400)
+
+def api_body(snap, endpoint, start, end, metrics):
+    def build():
+        if endpoint == 'metrics':
+            table = snap.metrics_frame(list(metrics)).astype({'year': 'int64'}).set_index('year').sort_index()
+            table = table.loc[start:end, list(metrics)]
+            payload = {'version': snap.version, 'years': table.index.tolist(), 'metrics': json_records(table)}
+        else:
+            corr = snap.correlation_matrix() if metrics == tuple(correlation_columns(snap)) else snap.metrics_frame(list(metrics))[list(metrics)].corr()
+            payload = {'version': snap.version, 'metrics': list(metrics), 'matrix': json_records(corr.T)}
+        return dumps_json(payload)
+    return snap.cached_bounded('api', (endpoint, start, end, metrics), build, API_CACHE_SIZE)
+
+# Clients revalidate with the ETag; a match gets a 304 without building the body
+def revalidated_response(key, build, mimetype):
+    etag = hashlib.sha256(key.encode()).hexdigest()[:32]
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(build(), mimetype=mimetype)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def api_response(snap, endpoint, start=None, end=None, metrics=()):
+    key = f"{snap.version}|{endpoint}|{start}|{end}|{','.join(metrics)}"
+    return revalidated_response(key, lambda: api_body(snap, endpoint, start, end, metrics), 'application/json')
+
+@app.server.route("/api/metrics")
+def api_metrics():
+    snap = current_snapshot()
+    start = api_year_arg('start', snap.years[0])
+    end = api_year_arg('end', snap.latest_year)
+    return api_response(snap, 'metrics', start, end, api_metric_names(snap, snap.metric_columns))
+
+@app.server.route("/api/correlations")
+def api_correlations():
+    snap = current_snapshot()
+    return api_response(snap, 'correlations', metrics=api_metric_names(snap, correlation_columns(snap)))
+
+# --- Embeddable figures ---
+# /embed/<fig_id>?year= is a standalone page with a single chart, for iframes in
+# other portals. It is plain Flask (no Dash layout, renderer or callbacks): the
+# page, with the cached figure JSON inlined, is built once per snapshot, figure
+# and year and revalidated by ETag, and plotly.js is served from here under a
+# versioned URL that browsers cache for good.
+EMBED_FRAME_ANCESTORS = os.environ.get("EMBED_FRAME_ANCESTORS", "*")  # CSP frame-ancestors
+PLOTLYJS_VERSION = get_plotlyjs_version()
+# Page titles for figures without a title of their own (their card headings)
+EMBED_TITLES = {
+    'overview_countries': "Top Countries in Fortune 500",
+    'overview_fdi': "FDI Flows",
+    'pie1': "eMNC Distribution by Country",
+    'pie2': "FDI Distribution",
+    'pie3': "Investment Type Distribution",
+    'correlation_heatmap': "Correlation Heatmap"
+}
+
+EMBED_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<style>html, body, #figure {{ margin: 0; width: 100%; height: 100%; overflow: hidden; }}</style>
+<script src="plotly.min.js?v={version}"></script>
+</head>
+<body>
+<div id="figure"></div>
+<script>
+var figure = {figure};
+var layout = Object.assign({{}}, figure.layout, {{autosize: true}});
+delete layout.width;
+delete layout.height;
+Plotly.newPlot('figure', figure.data, layout, {{responsive: true, displayModeBar: false}});
+</script>
+</body>
+</html>
+"""
+
+@lru_cache(maxsize=None)
+def plotlyjs_bundle():
+    source = get_plotlyjs().encode()
+    return source, gzip.compress(source)
+
+# JSON that is safe to inline in a <script> element
+def script_json(value):
+    if orjson is not None:
+        return fast_to_json(value)
+    out = pio.to_json(value, validate=False)
+    for char, escaped in _JSON_ESCAPES:
+        out = out.replace(char, escaped)
+    return out
+
+def embed_page(snap, fig_id, year):
+    def build():
+        fig = get_figure(snap, fig_id, year)
+        title = fig.get('layout', {}).get('title')
+        title = (title.get('text') if isinstance(title, dict) else title) or EMBED_TITLES.get(fig_id, fig_id)
+        if year is not None:
+            title = f"{title} ({year})"
+        page = EMBED_TEMPLATE.format(title=escape(title), version=PLOTLYJS_VERSION, figure=script_json(fig))
+        return page.encode()
+    return snap.cached(('embed', fig_id, year), build)
+
+@app.server.route("/embed/<fig_id>")
+def embed_figure(fig_id):
+    snap = current_snapshot()
+    if fig_id in YEAR_FIGURE_BUILDERS:
+        year = request.args.get('year', snap.latest_year, type=int)
+        if year not in snap.years:
+            abort(404)
+    elif fig_id in FIGURE_BUILDERS:
+        year = None
+    else:
+        abort(404)
+    response = revalidated_response(f"{snap.version}|embed|{fig_id}|{year}",
+                                    lambda: embed_page(snap, fig_id, year), 'text/html')
+    response.headers['Content-Security-Policy'] = f"frame-ancestors {EMBED_FRAME_ANCESTORS}"
+    return response
+
+@app.server.route("/embed/plotly.min.js")
+def embed_plotlyjs():
+    source, compressed = plotlyjs_bundle()
+    gzipped = 'gzip' in request.accept_encodings
+    response = Response(compressed if gzipped else source, mimetype='application/javascript')
+    if gzipped:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+# --- Rate limiting (opt-in with RATE_LIMIT_PER_SECOND) ---
+# Token bucket per client address on the callback endpoint:
+# RATE_LIMIT_PER_SECOND requests refill continuously up to RATE_LIMIT_BURST, so
+# a burst of dropdown scrubbing from one browser cannot tie up every worker.
+# Off by default: users behind one NAT or corporate proxy share an address and
+# so a bucket; size the burst for that before turning it on (e.g. 10/s, 30).
+# Behind reverse proxies set TRUSTED_PROXY_HOPS to their number, so the client
+# address is taken from the X-Forwarded-For entry the outermost trusted proxy
+# added. Without it the header is ignored, since any client can send one.
+RATE_LIMIT_PER_SECOND = float(os.environ.get("RATE_LIMIT_PER_SECOND", 0))
+RATE_LIMIT_BURST = float(os.environ.get("RATE_LIMIT_BURST", 30))
+RATE_LIMIT_MAX_CLIENTS = 10_000
+TRUSTED_PROXY_HOPS = int(os.environ.get("TRUSTED_PROXY_HOPS", 0))
+
+if TRUSTED_PROXY_HOPS:
+    app.server.wsgi_app = ProxyFix(app.server.wsgi_app, x_for=TRUSTED_PROXY_HOPS)
+
+_rate_lock = threading.Lock()
+_rate_buckets = {}  # client -> (tokens, last refill time)
+
+def client_id():
+    # The socket address, or the forwarded one when ProxyFix trusts the proxies
+    return request.remote_addr
+
+# Take one token from the client's bucket; returns seconds to wait when empty
+def take_token(client, now):
+    with _rate_lock:
+        tokens, last = _rate_buckets.get(client, (RATE_LIMIT_BURST, now))
+        tokens = min(RATE_LIMIT_BURST, tokens + (now - last) * RATE_LIMIT_PER_SECOND)
+        if len(_rate_buckets) >= RATE_LIMIT_MAX_CLIENTS and client not in _rate_buckets:
+            # Forget clients whose buckets have refilled; they are back to defaults anyway
+            full_after = RATE_LIMIT_BURST / RATE_LIMIT_PER_SECOND
+            for stale in [c for c, (_, seen) in _rate_buckets.items() if now - seen >= full_after]:
+                del _rate_buckets[stale]
+        if tokens < 1:
+            _rate_buckets[client] = (tokens, now)
+            return (1 - tokens) / RATE_LIMIT_PER_SECOND
+        _rate_buckets[client] = (tokens - 1, now)
+        return 0
+
+@app.server.before_request
+def _rate_limit_callbacks():
+    if RATE_LIMIT_PER_SECOND <= 0 or request.path != app.config.routes_pathname_prefix + "_dash-update-component":
+        return None
+    wait = take_token(client_id(), time.monotonic())
+    if wait:
+        response = jsonify({'error': 'Too many requests'})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(math.ceil(wait))
+        return response
+    return None
+
+# --- Memory diagnostics (opt-in with MEMORY_DIAGNOSTICS=1) ---
+# /debug/memory reports this worker's RSS, the largest tracemalloc allocation
+# sites (and their growth since the boot warm-up) and the size of each
+# in-process cache, for sizing containers and spotting cache growth. Tracing
+# starts here; set PYTHONTRACEMALLOC=1 as well to include the data load.
+MEMORY_DIAGNOSTICS = os.environ.get("MEMORY_DIAGNOSTICS", "").lower() in ("1", "true", "yes")
+MEMORY_TOP_ALLOCATORS = 15
+MEMORY_GROUPINGS = ('lineno', 'filename', 'traceback')
+
+LRU_CACHES = {
+    'future_sections': future_sections,
+    'plotlyjs_bundle': plotlyjs_bundle
+}
+
+_memory_baseline = None
+
+if MEMORY_DIAGNOSTICS and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+# Approximate bytes held by obj, counting objects already in seen only once
+def deep_sizeof(obj, seen):
+    if obj is None or id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return sys.getsizeof(obj) + deep_sizeof(obj.base, seen)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in list(obj.items()))
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(deep_sizeof(item, seen) for item in list(obj))
+    elif isinstance(obj, dash.development.base_component.Component):
+        size += deep_sizeof(vars(obj), seen)
+    return size
+
+def process_memory():
+    usage = {'rss_bytes': None, 'peak_rss_bytes': None}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in ('VmRSS', 'VmHWM'):
+                    usage['rss_bytes' if name == 'VmRSS' else 'peak_rss_bytes'] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    return usage
+
+def snapshot_footprint(snap):
+    seen = set()
+    data_bytes = sum(deep_sizeof(frame, seen) for frame in (snap.df, snap.countries_df, snap.country_ranks, snap.editions_df))
+    data_bytes += deep_sizeof(snap.series, seen)
+    by_kind = {}
+    for key, value in list(snap._cache.items()):
+        kind = key[0] if isinstance(key, tuple) else key
+        entries, size = by_kind.get(kind, (0, 0))
+        by_kind[kind] = (entries + 1, size + deep_sizeof(value, seen))
+    for kind, bounded in list(snap._bounded.items()):
+        by_kind[kind] = (len(bounded), sum(deep_sizeof(value, seen) for value in list(bounded.values())))
+    return {
+        'version': snap.version,
+        'current': snap is current_snapshot(),
+        'data_bytes': data_bytes,
+        'cache_entries': sum(entries for entries, _ in by_kind.values()),
+        'cache_bytes': sum(size for _, size in by_kind.values()),
+        'cache_by_kind': {kind: {'entries': entries, 'bytes': size} for kind, (entries, size) in sorted(by_kind.items())}
+    }
+
+def export_cache_footprint():
+    files = size = 0
+    if os.path.isdir(EXPORT_CACHE_DIR):
+        for entry in os.scandir(EXPORT_CACHE_DIR):
+            if entry.is_file():
+                files += 1
+                size += entry.stat().st_size
+    return {'files': files, 'disk_bytes': size, 'renders_in_flight': len(_export_inflight)}
+
+def mark_memory_baseline():
+    global _memory_baseline
+    if tracemalloc.is_tracing():
+        _memory_baseline = tracemalloc.take_snapshot()
+
+def allocation_stats(stats, group):
+    rows = []
+    for stat in stats:
+        frame = stat.traceback[0]
+        row = {'location': frame.filename if group == 'filename' else f"{frame.filename}:{frame.lineno}"}
+        if group == 'traceback':
+            row['traceback'] = stat.traceback.format()
+        row.update({'bytes': stat.size, 'blocks': stat.count})
+        if hasattr(stat, 'size_diff'):
+            row.update({'bytes_diff': stat.size_diff, 'blocks_diff': stat.count_diff})
+        rows.append(row)
+    return rows
+
+def tracemalloc_report(top, group):
+    if not tracemalloc.is_tracing():
+        return None
+    traced, peak = tracemalloc.get_traced_memory()
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    snapshot = tracemalloc.take_snapshot().filter_traces(ignore)
+    report = {
+        'traced_bytes': traced,
+        'peak_traced_bytes': peak,
+        'frames': tracemalloc.get_traceback_limit(),
+        'top': allocation_stats(snapshot.statistics(group)[:top], group),
+        'growth_since_baseline': None
+    }
+    if _memory_baseline is not None:
+        growth = snapshot.compare_to(_memory_baseline.filter_traces(ignore), group)
+        report['growth_since_baseline'] = allocation_stats(growth[:top], group)
+    return report
+
+def memory_report(top=MEMORY_TOP_ALLOCATORS, group='lineno'):
+    seen = set()
+    return {
+        'pid': os.getpid(),
+        'version': current_snapshot().version,
+        'process': process_memory(),
+        'tracemalloc': tracemalloc_report(top, group),
+        'snapshots': [snapshot_footprint(snap) for snap in snapshot_history()],
+        'lru_caches': {name: func.cache_info()._asdict() for name, func in LRU_CACHES.items()},
+        'layout_bytes': deep_sizeof(app.layout, seen),
+        'export_cache': export_cache_footprint(),
+        'rate_limit_clients': len(_rate_buckets)
+    }
+
+@app.server.route("/debug/memory")
+def memory_diagnostics():
+    if not MEMORY_DIAGNOSTICS:
+        abort(404)
+    group = request.args.get('group', 'lineno')
+    if group not in MEMORY_GROUPINGS:
+        abort(400)
+    report = memory_report(min(max(request.args.get('top', MEMORY_TOP_ALLOCATORS, type=int), 1), 100), group)
+    # ?baseline=1 measures later growth from this point instead of the boot warm-up
+    if request.args.get('baseline'):
+        mark_memory_baseline()
+    return jsonify(report)
+
+# --- Boot warm-up and health checks ---
+# At import the current snapshot is warmed across WARMUP_WORKERS processes, so
+# the first user after a deploy does not pay for building every tab. The
+# workers are forked at import, before any server or refresh threads exist;
+# their results are collected on a background thread, so the server starts
+# answering at once. A server that forks after importing the app (gunicorn
+# --preload) waits for that thread first, so its workers start warm. A serving
+# process that still has no warm snapshot (the warm-up failed before the fork)
+# warms one itself on its first request. /readyz stays 503 until the snapshot
+# being served is warm; /healthz only reports that the process is up.
+WARMUP_ON_BOOT = os.environ.get("WARMUP_ON_BOOT", "1").lower() in ("1", "true", "yes")
+WARMUP_WORKERS = int(os.environ.get("WARMUP_WORKERS", os.cpu_count() or 1))
+
+_warmup_seconds = None
+_warmup_thread = None
+_warmup_pid = None  # process the current warm-up attempt belongs to
+_warmup_lock = threading.Lock()
+
+def _finish_warm_up(snap, running, start):
+    global _warmup_seconds
+    try:
+        warm_snapshot(snap, running=running)
+    except Exception:
+        app.logger.exception("Boot warm-up of dataset version %s failed", snap.version)
+        return
+    _warmup_seconds = time.perf_counter() - start
+    mark_memory_baseline()
+    app.logger.info("Warmed dataset version %s in %.2fs (%d workers)", snap.version, _warmup_seconds, len(running or ()) or 1)
+
+def warm_up(workers=WARMUP_WORKERS):
+    global _warmup_thread, _warmup_pid
+    start = time.perf_counter()
+    snap = current_snapshot()
+    _warmup_pid = os.getpid()
+    running = fork_figure_workers(snap, workers)
+    _warmup_thread = threading.Thread(target=_finish_warm_up, args=(snap, running, start), name="warm-up", daemon=True)
+    _warmup_thread.start()
+
+# A child forked mid warm-up would inherit locks and in-flight computations
+# owned by a thread it does not have
+def _wait_for_warm_up():
+    thread = _warmup_thread
+    if thread is not None and thread is not threading.current_thread() and _warmup_pid == os.getpid():
+        thread.join()
+
+os.register_at_fork(before=_wait_for_warm_up)
+
+# Serial: by the first request the process has server threads, so forking
+# figure workers is no longer safe
+@app.server.before_request
+def _ensure_warm_up():
+    if WARMUP_ON_BOOT and _warmup_seconds is None and _warmup_pid != os.getpid():
+        with _warmup_lock:
+            if _warmup_pid != os.getpid():
+                warm_up(workers=1)
+
+def is_ready():
+    # Refreshed snapshots are warmed before they are published
+    return _warmup_seconds is not None or not WARMUP_ON_BOOT
+
+@app.server.route("/healthz")
+def healthz():
+    return jsonify({'status': 'ok'})
+
+@app.server.route("/readyz")
+def readyz():
+    body = {
+        'ready': is_ready(),
+        'version': current_snapshot().version,
+        'warmup_seconds': None if _warmup_seconds is None else round(_warmup_seconds, 3)
+    }
+    return jsonify(body), 200 if body['ready'] else 503
+
+# Export workers import this module too; they never serve pages
+if WARMUP_ON_BOOT and multiprocessing.parent_process() is None:
+    warm_up()
 
 # Run server
 if __name__ == '__main__':
@@ -0,0 +1,101 @@
+# Memory footprint of one worker: loads the app with tracemalloc on, opens
+# every page and scrubs every year through the Flask test client (the same
+# requests a browser sends), repeats that a few times and prints RSS per pass,
+# then the steady-state breakdown from cornell3.memory_report(). Growth after
+# the first pass points at an unbounded cache or a leak.
+#
+#   python footprint.py [--passes 3] [--top 10] [--json footprint.json]
+import argparse
+import json
+import os
+import tracemalloc
+
+os.environ.setdefault("WARMUP_ON_BOOT", "0")
+os.environ.setdefault("RATE_LIMIT_PER_SECOND", "0")
+os.environ["MEMORY_DIAGNOSTICS"] = "1"
+tracemalloc.start()
+
+import cornell3
+import loadtest
+
+KB = 1024
+MB = 1024 * KB
+
+
+def post_callback(client, outputs, inputs, changed=None, state=()):
+    response = client.post('/_dash-update-component', json=loadtest.callback_payload(outputs, inputs, changed, state))
+    if response.status_code not in (200, 204):
+        raise SystemExit(f"callback for {outputs[0][0]} failed with status {response.status_code}")
+    return response
+
+
+def visit_every_page(client, years):
+    for path in ('/', '/_dash-layout', '/_dash-dependencies'):
+        client.get(path)
+    visits = [(tab, '') for tab in loadtest.TABS] + [('distribution', f"?year={year}") for year in years]
+    for tab, search in visits:
+        # Each visit is a first visit in a new session, so the page is mounted
+        post_callback(client, loadtest.PAGE_OUTPUTS, loadtest.page_inputs(tab, search))
+        inputs, state = loadtest.mount_inputs([tab], search)
+        response = post_callback(client, loadtest.MOUNT_OUTPUTS, inputs, state=state)
+        for _, outputs, inputs, changed in loadtest.mount_callbacks(response.get_json()):
+            post_callback(client, outputs, inputs, changed)
+    for year in years:
+        post_callback(client, loadtest.OVERVIEW_OUTPUTS, [('overview_year', 'value', year)])
+        post_callback(client, loadtest.PIES_OUTPUTS, [('dist_year', 'value', year)])
+
+
+def usage_line(label, previous=None):
+    rss = cornell3.process_memory()['rss_bytes']
+    traced, peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    line = f"{label:<20}{rss / MB if rss else float('nan'):>10.1f}{traced / MB:>12.1f}{peak / MB:>12.1f}"
+    if previous:
+        line += f"{(rss - previous[0]) / MB if rss else float('nan'):>+12.1f}{(traced - previous[1]) / MB:>+12.1f}"
+    print(line)
+    return rss, traced
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the steady-state memory footprint of one dashboard worker")
+    parser.add_argument('--passes', type=int, default=3, help="full sweeps over every page and year")
+    parser.add_argument('--top', type=int, default=10, help="allocation sites to list")
+    parser.add_argument('--json', default=None, help="also save the final memory report here")
+    args = parser.parse_args()
+
+    snap = cornell3.current_snapshot()
+    client = cornell3.server.test_client()
+    print(f"{'stage':<20}{'RSS MB':>10}{'traced MB':>12}{'peak MB':>12}{'RSS diff':>12}{'traced diff':>12}")
+    previous = usage_line("data loaded")
+    cornell3.warm_snapshot(snap)
+    previous = usage_line("snapshot warmed", previous)
+    cornell3.mark_memory_baseline()
+    for n in range(1, args.passes + 1):
+        visit_every_page(client, snap.years)
+        previous = usage_line(f"pass {n}", previous)
+
+    report = cornell3.memory_report(top=args.top)
+    print(f"\nLayout: {report['layout_bytes'] / KB:,.0f} KB")
+    for footprint in report['snapshots']:
+        print(f"Snapshot {footprint['version']}: data {footprint['data_bytes'] / KB:,.0f} KB, "
+              f"{footprint['cache_entries']} cached entries {footprint['cache_bytes'] / KB:,.0f} KB")
+        for kind, entry in footprint['cache_by_kind'].items():
+            print(f"  {kind:<22}{entry['entries']:>6}{entry['bytes'] / KB:>10,.0f} KB")
+    print("LRU caches (entries / max):")
+    for name, info in report['lru_caches'].items():
+        print(f"  {name:<22}{info['currsize']:>6} / {info['maxsize'] if info['maxsize'] is not None else 'unbounded'}")
+    print(f"\nTop allocation sites ({report['tracemalloc']['traced_bytes'] / MB:.1f} MB traced):")
+    for row in report['tracemalloc']['top']:
+        print(f"  {row['bytes'] / MB:>8.2f} MB  {row['location']}")
+    print("Largest changes since the snapshot was warmed:")
+    for row in report['tracemalloc']['growth_since_baseline']:
+        print(f"  {row['bytes_diff'] / MB:>+8.2f} MB  {row['location']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved {args.json}")
+
+
+if __name__ == '__main__':
+    main()
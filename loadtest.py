@@ -0,0 +1,332 @@
+# Load test: simulated dashboard users against a running or locally started server.
+#
+# Each virtual user lands on the home page or a shared ?year= link, opens the
+# six pages in random order and scrubs through the years on overview_year and
+# dist_year, with a random think time between actions. It makes the server
+# round trips a browser makes: the page router on every navigation, and the
+# page's layout and the callbacks its components fire only the first time a
+# page is opened in a session. Concurrency is ramped through --stages;
+# throughput, latency percentiles and error rates are reported per callback
+# and saved as JSON so runs of different versions can be compared. All users
+# share one address, so the server's callback rate limit is turned off for
+# --start (leave it off on a server given by --url); any 429s are still
+# counted separately from errors.
+#
+#   python loadtest.py --start --stages 1,2,4,8 --stage-seconds 20
+#   python loadtest.py --url http://127.0.0.1:10000 --out before.json
+#   python loadtest.py --start --out after.json --compare before.json
+import argparse
+import json
+import os
+import random
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+TABS = ["overview", "trends", "distribution", "macro", "correlations", "future"]
+PAGE_PATHS = {tab: "/" if tab == "overview" else f"/{tab}" for tab in TABS}
+PAGE_OUTPUTS = [('_pages_content', 'children'), ('_pages_store', 'data')]
+MOUNT_OUTPUTS = [(f"page-{tab}", 'children') for tab in TABS]
+
+OVERVIEW_OUTPUTS = [('overview_text', 'children'), ('overview_metrics', 'children'),
+                    ('overview_countries', 'figure'), ('overview_fdi', 'figure')]
+PIES_OUTPUTS = [('pie1', 'figure'), ('pie2', 'figure'), ('pie3', 'figure'), ('distribution_metrics', 'children')]
+
+# Callbacks that fire when a page's components mount: (label, outputs, inputs, changed).
+# Inputs are read from the mounted components; those listed in changed were set
+# by a clientside callback (the browser width) rather than by the layout.
+MOUNT_CALLBACKS = [
+    ('update_overview', OVERVIEW_OUTPUTS, [('overview_year', 'value')], []),
+    ('update_pies', PIES_OUTPUTS, [('dist_year', 'value')], []),
+    ('update_correlations',
+     [('correlation_heatmap', 'figure'), ('strong_correlations', 'children'), ('correlation_insights', 'children')],
+     [('correlation_heatmap', 'id')], []),
+    ('update_scenario', [('scenario_fan', 'figure'), ('scenario_summary', 'children')],
+     [('scenario_metric', 'value'), ('scenario_ofdi_growth', 'value'), ('scenario_greenfield_trend', 'value'),
+      ('scenario_esg_rate', 'value'), ('scenario_horizon', 'value')], []),
+    ('update_series', [('series_graph', 'figure')],
+     [('series_select', 'value'), ('series_graph', 'relayoutData'), ('series_width', 'data')], ['series_width.data']),
+    ('update_editions', [('edition_levels', 'figure'), ('edition_revisions', 'figure')],
+     [('edition_metric', 'value'), ('edition_base', 'value'), ('edition_compare', 'value')], [])
+]
+BROWSER_WIDTH = 1280
+
+
+# Body of a /_dash-update-component request, as the Dash renderer sends it;
+# changed defaults to every input, and is empty when components just mounted
+def callback_payload(outputs, inputs, changed=None, state=()):
+    specs = [{'id': component, 'property': prop} for component, prop in outputs]
+    if len(outputs) == 1:
+        output = "{}.{}".format(*outputs[0])
+    else:
+        output = '..' + '...'.join(f"{component}.{prop}" for component, prop in outputs) + '..'
+    payload = {
+        'output': output,
+        'outputs': specs[0] if len(specs) == 1 else specs,
+        'inputs': [{'id': component, 'property': prop, 'value': value} for component, prop, value in inputs],
+        'state': [{'id': component, 'property': prop, 'value': value} for component, prop, value in state]
+    }
+    if changed is None:
+        changed = [f"{component}.{prop}" for component, prop, _ in inputs]
+    if changed:
+        payload['changedPropIds'] = changed
+    return payload
+
+
+# Props of every component with an id in a callback response, by id
+def component_props(node, found=None):
+    found = {} if found is None else found
+    if isinstance(node, dict):
+        props = node.get('props')
+        if isinstance(node.get('type'), str) and isinstance(props, dict) and isinstance(props.get('id'), str):
+            found[props['id']] = props
+        for value in node.values():
+            component_props(value, found)
+    elif isinstance(node, list):
+        for value in node:
+            component_props(value, found)
+    return found
+
+
+# Inputs of the page routing callback when the browser opens a page
+def page_inputs(tab, search=''):
+    return [('_pages_location', 'pathname', PAGE_PATHS[tab]), ('_pages_location', 'search', search)]
+
+
+# Inputs and state of the callback that mounts a page opened for the first time;
+# mounted lists the pages opened so far in the session, ending with this one
+def mount_inputs(mounted, search=''):
+    return [('mounted_pages', 'data', list(mounted))], [('page_url', 'search', search)]
+
+
+# Callbacks fired by the components of a page layout response, with their inputs
+def mount_callbacks(response_json):
+    props = component_props(response_json)
+    props.setdefault('series_width', {})['data'] = BROWSER_WIDTH
+    for label, outputs, inputs, changed in MOUNT_CALLBACKS:
+        if inputs[0][0] in props:
+            values = [(component, prop, props.get(component, {}).get(prop)) for component, prop in inputs]
+            yield label, outputs, values, changed
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)  # label -> [(seconds, status)]
+
+    def add(self, label, seconds, status):
+        with self._lock:
+            self.samples[label].append((seconds, status))
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(max(int(len(sorted_values) * q / 100 + 0.5) - 1, 0), len(sorted_values) - 1)]
+
+
+def summarize(samples, seconds):
+    latencies = sorted(s for s, _ in samples)
+    limited = sum(1 for _, status in samples if status == 429)
+    errors = sum(1 for _, status in samples if status >= 400 and status != 429 or status == 0)
+    return {
+        'requests': len(samples),
+        'throughput': round(len(samples) / seconds, 2),
+        'p50_ms': round(percentile(latencies, 50) * 1e3, 1) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95) * 1e3, 1) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99) * 1e3, 1) if latencies else None,
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+        'rate_limited': limited
+    }
+
+
+class VirtualUser:
+    def __init__(self, base_url, user_id, years, think, recorder):
+        self.base_url = base_url.rstrip('/')
+        self.years = years
+        self.think = think
+        self.recorder = recorder
+        self.rng = random.Random(user_id)
+        self.session = requests.Session()
+        self.mounted = []  # pages opened in the current session
+
+    def request(self, label, method, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=60, **kwargs)
+            status = response.status_code
+        except requests.RequestException:
+            response, status = None, 0
+        self.recorder.add(label, time.perf_counter() - start, status)
+        return response if status == 200 else None
+
+    def callback(self, label, outputs, inputs, changed=None, state=()):
+        return self.request(label, 'POST', '/_dash-update-component',
+                            json=callback_payload(outputs, inputs, changed, state))
+
+    def pause(self):
+        if self.think:
+            time.sleep(self.rng.uniform(0, 2 * self.think))
+
+    # Pages already opened in this session are only shown again by the browser
+    def open_page(self, tab, search=''):
+        self.callback('page_router', PAGE_OUTPUTS, page_inputs(tab, search))
+        if tab in self.mounted:
+            return
+        self.mounted.append(tab)
+        inputs, state = mount_inputs(self.mounted, search)
+        response = self.callback('mount_page', MOUNT_OUTPUTS, inputs, state=state)
+        if response is None:
+            return
+        for label, outputs, inputs, changed in mount_callbacks(response.json()):
+            self.callback(label, outputs, inputs, changed)
+
+    def scrub(self, label, outputs, component):
+        for year in self.rng.sample(self.years, k=min(4, len(self.years))):
+            self.callback(label, outputs, [(component, 'value', year)])
+            self.pause()
+
+    def run_session(self):
+        self.mounted = []
+        landing, search = 'overview', ''
+        if self.rng.random() < 0.5:
+            landing, search = 'distribution', f"?year={self.rng.choice(self.years)}"
+        self.request('page', 'GET', PAGE_PATHS[landing] + search)
+        self.request('layout', 'GET', '/_dash-layout')
+        self.request('dependencies', 'GET', '/_dash-dependencies')
+        self.open_page(landing, search)
+        self.pause()
+        for tab in self.rng.sample([t for t in TABS if t != landing], k=len(TABS) - 1):
+            self.open_page(tab)
+            self.pause()
+        self.open_page('overview')
+        self.scrub('update_overview', OVERVIEW_OUTPUTS, 'overview_year')
+        self.open_page('distribution')
+        self.scrub('update_pies', PIES_OUTPUTS, 'dist_year')
+
+
+def run_stage(base_url, users, seconds, years, think, first_user_id):
+    recorder = Recorder()
+    deadline = time.monotonic() + seconds
+
+    def loop(user_id):
+        user = VirtualUser(base_url, user_id, years, think, recorder)
+        while time.monotonic() < deadline:
+            user.run_session()
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(loop, range(first_user_id, first_user_id + users)))
+    elapsed = time.monotonic() - start
+    callbacks = {label: summarize(samples, elapsed) for label, samples in sorted(recorder.samples.items())}
+    every = [sample for samples in recorder.samples.values() for sample in samples]
+    return {'users': users, 'seconds': round(elapsed, 2), 'callbacks': callbacks, 'total': summarize(every, elapsed)}
+
+
+def start_server(command, port):
+    # Every virtual user comes from 127.0.0.1, so a per-client rate limit would throttle them as one
+    env = dict(os.environ, PORT=str(port), RATE_LIMIT_PER_SECOND="0")
+    # The server's request log is discarded so it does not interleave with the report
+    process = subprocess.Popen(shlex.split(command.format(python=shlex.quote(sys.executable), port=port)), env=env,
+                               cwd=os.path.dirname(os.path.abspath(__file__)),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 300
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"server exited with status {process.returncode}")
+        try:
+            if requests.get(base_url + '/readyz', timeout=2).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise SystemExit("server did not become ready")
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_stage(stage, previous=None):
+    total = stage['total']
+    print(f"\n{stage['users']} users, {stage['seconds']}s: {total['throughput']} req/s, "
+          f"p95 {total['p95_ms']} ms, errors {total['error_rate']:.2%}, rate limited {total['rate_limited']}")
+    print(f"  {'callback':<22}{'req':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>9}"
+          + (f"{'p95 diff':>10}" if previous else ""))
+    for label, stats in stage['callbacks'].items():
+        line = (f"  {label:<22}{stats['requests']:>7}{stats['throughput']:>9}{stats['p50_ms']:>9}"
+                f"{stats['p95_ms']:>9}{stats['p99_ms']:>9}{stats['error_rate']:>9.2%}")
+        before = (previous or {}).get('callbacks', {}).get(label)
+        if before and before['p95_ms'] is not None and stats['p95_ms'] is not None:
+            line += f"{stats['p95_ms'] - before['p95_ms']:>+10.1f}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ramp simulated dashboard users and report per-callback latency")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', default="http://127.0.0.1:10000", help="server to test")
+    target.add_argument('--start', action='store_true', help="start a server for the test and stop it afterwards")
+    parser.add_argument('--server-cmd', default="{python} cornell3.py",
+                        help="command used by --start; {python} and {port} are substituted")
+    parser.add_argument('--port', type=int, default=18050, help="port for --start")
+    parser.add_argument('--stages', default="1,2,4,8,16", help="comma-separated concurrent user counts")
+    parser.add_argument('--stage-seconds', type=float, default=20)
+    parser.add_argument('--think', type=float, default=0.5, help="mean seconds between user actions")
+    parser.add_argument('--out', default=None, help="JSON results file (default: loadtest-<revision>-<time>.json)")
+    parser.add_argument('--compare', default=None, help="earlier results file to show p95 changes against")
+    args = parser.parse_args()
+
+    process = None
+    base_url = args.url
+    if args.start:
+        process, base_url = start_server(args.server_cmd, args.port)
+    try:
+        years = requests.get(base_url + '/api/metrics?metrics=EMNC_total', timeout=30).json()['years']
+        previous = {}
+        if args.compare:
+            with open(args.compare) as f:
+                previous = {stage['users']: stage for stage in json.load(f)['stages']}
+        stages = []
+        first_user_id = 1
+        for users in (int(n) for n in args.stages.split(',')):
+            stage = run_stage(base_url, users, args.stage_seconds, years, args.think, first_user_id)
+            first_user_id += users
+            print_stage(stage, previous.get(users))
+            stages.append(stage)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    revision = git_revision()
+    results = {
+        'meta': {
+            'revision': revision,
+            'url': base_url,
+            'started_server': args.start,
+            'think_seconds': args.think,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S%z')
+        },
+        'stages': stages
+    }
+    out = args.out or f"loadtest-{revision or 'unknown'}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(out, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nSaved {out}")
+
+
+if __name__ == '__main__':
+    main()